@@ -20,6 +20,8 @@ from adafruit_button import Button
 from adafruit_display_text.label import Label
 import adafruit_imageload
 import adafruit_bme680
+from samplelog import SampleLog
+from plotter import Plotter
 
 i2c = board.I2C()
 sensor = adafruit_bme680.Adafruit_BME680_I2C(i2c)
@@ -32,6 +34,7 @@ BLUE = 0x0000FF
 BLACK = 0x0
 ORANGE = 0xE39300
 WHITE = 0xFFFFFF
+GREEN = 0x00FF00
 
 BOX_WIDTH = 80 #box sizes in each corner for temp/humidity/BP/VOC
 
@@ -239,6 +242,16 @@ buttons.append(button_voc)
 splash.append(button_voc)
 
 
+#Chart the readings between the corner buttons, one point per reading
+chart = Plotter(SCREEN_WIDTH - 2 * BOX_WIDTH, SCREEN_HEIGHT - 2 * BOX_WIDTH,
+                BOX_WIDTH, BOX_WIDTH)
+TEMP_SERIES = chart.add_series("C", ORANGE, 0, 40)
+HUMIDITY_SERIES = chart.add_series("%", BLUE, 0, 100)
+PRESSURE_SERIES = chart.add_series("hPa", WHITE, 950, 1050)
+GAS_SERIES = chart.add_series("ohm", GREEN, 0, 200000)
+splash.append(chart.group)
+
+
 feed1_label = Label(font, text="", color=ORANGE)
 feed1_label.x = 0
 feed1_label.y = 0
@@ -337,6 +350,22 @@ def text_box(target, top, max_chars, string):
 # separate temperature sensor to calibrate this one.
 temperature_offset = 0 #-1.8
 
+#Log sensor readings to the SD card, PyPortal() has already mounted it at /sd
+LOG_DIR = "/sd/log"
+#Temperature and humidity in hundredths, pressure in tenths of a hPa, gas in hundreds of ohms
+LOG_SCALES = (100, 100, 10, 0.01)
+
+sample_log = None
+if pyportal.sd_check():
+    try:
+        os.mkdir(LOG_DIR)
+    except OSError:
+        pass
+    #One reading every 5 seconds, write once a minute
+    sample_log = SampleLog(LOG_DIR, "buoy_", LOG_SCALES, flush_every=12)
+else:
+    print("No SD card, readings will not be logged")
+
 #Initialize while loop variables
 refresh_time = None
 refresh_time2 = None
@@ -355,6 +384,9 @@ while True:
         #Set temperatures
         tempC = sensor.temperature + temperature_offset
         tempF = (tempC * 9/5) + 32
+        humidity = sensor.humidity
+        pressure = sensor.pressure
+        gas = sensor.gas
 
         '''
         temp_label.text = "{:.1f}/{:.1f}".format(tempC, tempF)
@@ -364,9 +396,18 @@ while True:
         '''
         
         button_temp.label = "{:.1f}/{:.1f}".format(tempC, tempF)
-        button_humidity.label = '{:.0f}% {}'.format(sensor.humidity, c)
-        button_pressure.label = '{:.0f}'.format(sensor.pressure)
-        button_voc.label = '{}'.format(sensor.gas) #ohms
+        button_humidity.label = '{:.0f}% {}'.format(humidity, c)
+        button_pressure.label = '{:.0f}'.format(pressure)
+        button_voc.label = '{}'.format(gas) #ohms
+        
+        #Each series redraws on its own, the axes and legend stay put
+        chart.append(TEMP_SERIES, tempC)
+        chart.append(HUMIDITY_SERIES, humidity)
+        chart.append(PRESSURE_SERIES, pressure)
+        chart.append(GAS_SERIES, gas)
+        
+        if sample_log:
+            sample_log.append(time.time(), (tempC, humidity, pressure, gas))
         
         refresh_time2 = time.monotonic()
     
@@ -0,0 +1,97 @@
+'''
+CES 20211018
+Host benchmark for the debug logging guards in logs.py.
+
+Times one frame's worth of the debug calls in the hot paths of Paint
+(one stroke segment), Surfing (a touch moving the board) and the Radio
+loop (a touch), with the logger at INFO so the output is dropped:
+
+    before    the calls as they were, formatting with str.format first
+    guarded   behind `if _DEBUG and log.debug_on:`
+    stripped  _DEBUG = const(0), the compiler leaves the calls out
+
+Exits with status 1 if the guarded frame is not cheaper than before.
+
+    python3 bench_logging.py [frames]
+'''
+
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(HERE, '..', 'v2')
+
+import fakes
+
+
+def frame_before(log, point, start, end):
+    #Paint._draw_line and _handle_motion
+    log.debug("* GoTo from (%d, %d) to (%d, %d)", start[0], start[1],
+              end[0], end[1])
+    log.debug("Moved: (%d, %d) -> (%d, %d)", start[0], start[1],
+              end[0], end[1])
+    #VRSurfing code.py, Surfing.process_input and move_board_up
+    log.debug('Screen touched: {}'.format(point))
+    log.debug('In process_input = {}'.format(point))
+    log.debug('UP!')
+    #Radio main loop
+    log.debug("point: {}".format(point))
+
+
+def frame_guarded(log, point, start, end, _DEBUG=1):
+    if _DEBUG and log.debug_on:
+        log.debug("* GoTo from (%d, %d) to (%d, %d)", start[0], start[1],
+                  end[0], end[1])
+    if _DEBUG and log.debug_on:
+        log.debug("Moved: (%d, %d) -> (%d, %d)", start[0], start[1],
+                  end[0], end[1])
+    if _DEBUG and log.debug_on:
+        log.debug('Screen touched: %s', point)
+    if _DEBUG and log.debug_on:
+        log.debug('In process_input = %s', point)
+    if _DEBUG and log.debug_on:
+        log.debug('UP!')
+    if _DEBUG and log.debug_on:
+        log.debug("point: %s", point)
+
+
+def frame_stripped(log, point, start, end):
+    pass
+
+
+def run(frame, log, frames):
+    point = (120, 200, 30000)
+    start = (100, 150)
+    end = (104, 149)
+    began = time.perf_counter()
+    for _ in range(frames):
+        frame(log, point, start, end)
+    return (time.perf_counter() - began) / frames
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    fakes.install(fakes.VirtualClock(0))
+    sys.path.insert(0, APP)
+    import adafruit_logging as logging
+    import logs
+
+    log = logs.getLogger('bench', logging.INFO)
+    results = []
+    for name, frame in (('before', frame_before), ('guarded', frame_guarded),
+                        ('stripped', frame_stripped)):
+        results.append((name, run(frame, log, frames)))
+    before = results[0][1]
+    print('variant   us/frame  saving')
+    for name, seconds in results:
+        print('%-8s  %8.2f  %5.0f%%' % (
+            name, seconds * 1e6, 100 * (1 - seconds / before)))
+    if results[1][1] >= before:
+        print('FAIL: guarded debug calls cost as much as unguarded ones')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
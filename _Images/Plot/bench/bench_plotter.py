@@ -0,0 +1,176 @@
+'''
+CES 20211018
+Host benchmark for the Plot/v2 strip chart.
+
+Runs Plot/v2/code.py unmodified against the counting stand-ins in
+fakes.py, with a virtual clock and synthetic sensors. A touch at the end
+of each phase steps time_range_hrs through every range, so every range
+gets both per-sample cost and range-change redraw cost.
+
+A sample that moves the axes redraws the whole chart, writing at least
+every pixel once. Those are counted as rescales and held to the redraw
+budget instead.
+
+Exits with status 1 if any sample or redraw goes over its pixel write
+budget, any range rescales on more than MAX_RESCALE_FRACTION of its
+samples, or allocates displayio objects or Labels while sampling.
+
+    python3 bench_plotter.py [samples_per_phase]
+'''
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(HERE, '..', 'v2')
+
+import fakes
+
+WIDTH = 480
+HEIGHT = 320
+RANGES = list(range(2, 26, 2))
+
+#One sample redraws a single column: its background plus the temp and
+#light bands. A band is a line_height line (as in code.py) widened by the
+#spread of the column's samples, a few pixels for the synthetic sensors
+LINE_HEIGHT = 5
+BAND_SPREAD = 8
+MAX_WRITES_PER_BAND = 2 * LINE_HEIGHT - 1 + BAND_SPREAD
+MAX_WRITES_PER_SAMPLE = HEIGHT + 2 * MAX_WRITES_PER_BAND
+#A range change or rescale redraws every column once
+MIN_WRITES_PER_REDRAW = WIDTH * HEIGHT
+MAX_WRITES_PER_REDRAW = WIDTH * MAX_WRITES_PER_SAMPLE
+MAX_RESCALE_FRACTION = 0.2
+#Both axes may settle once from their starting bounds after boot
+STARTUP_RESCALES = 2
+
+
+class Stats:
+    """Cost of the runs of one task at one range. Runs that write every
+    pixel are full redraws and are kept apart."""
+
+    def __init__(self):
+        self.runs = 0
+        self.writes = 0
+        self.max_writes = 0
+        self.allocations = 0
+        self.seconds = 0.0
+        self.redraws = 0
+        self.max_redraw_writes = 0
+        self.max_redraw_seconds = 0.0
+
+    def add(self, writes, allocations, seconds):
+        self.allocations += allocations
+        if writes >= MIN_WRITES_PER_REDRAW:
+            self.redraws += 1
+            self.max_redraw_writes = max(self.max_redraw_writes, writes)
+            self.max_redraw_seconds = max(self.max_redraw_seconds, seconds)
+            return
+        self.runs += 1
+        self.writes += writes
+        self.max_writes = max(self.max_writes, writes)
+        self.seconds += seconds
+
+    def mean(self, total):
+        return total / self.runs if self.runs else 0
+
+
+def run(samples_per_phase):
+    sample_sleep = 2 * 60 * 60 / WIDTH
+    phase = samples_per_phase * sample_sleep
+    #Touch just after the last sample of each phase, one touch per range
+    touches = [phase * (i + 1) - sample_sleep / 2 for i in range(len(RANGES))]
+    clock = fakes.VirtualClock(phase * len(RANGES) + 1)
+    restore = fakes.install(clock, WIDTH, HEIGHT, touches)
+    sys.path.insert(0, APP)
+    import scheduler
+    add = scheduler.Scheduler.add
+
+    try:
+        app = {'__name__': '__main__'}
+        stats = {}
+
+        def add_measured(self, name, period, callback, delay=0):
+            #Attribute the cost of each task run to the range in effect after it
+            def measured():
+                writes = fakes.counters['pixel_writes']
+                allocations = fakes.counters['allocations']
+                start = time.perf_counter()
+                callback()
+                seconds = time.perf_counter() - start
+                key = (name, app['time_range_hrs'])
+                stats.setdefault(key, Stats()).add(
+                    fakes.counters['pixel_writes'] - writes,
+                    fakes.counters['allocations'] - allocations,
+                    seconds)
+            return add(self, name, period, measured, delay)
+
+        scheduler.Scheduler.add = add_measured
+        path = os.path.join(APP, 'code.py')
+        with open(path) as f:
+            code = compile(f.read(), path, 'exec')
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                exec(code, app)
+            except fakes.StopBench:
+                pass
+        return stats
+    finally:
+        scheduler.Scheduler.add = add
+        sys.path.remove(APP)
+        restore()
+
+
+def main():
+    samples_per_phase = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    stats = run(samples_per_phase)
+
+    failed = False
+    print('range  samples  writes/sample  max  rescales  allocs  ms/sample  '
+          'redraw writes  redraw ms')
+    for hrs in RANGES:
+        sample = stats.get(('sample', hrs), Stats())
+        touch = stats.get(('touch', hrs), Stats())
+        redraw_writes = max(sample.max_redraw_writes, touch.max_redraw_writes)
+        redraw_seconds = max(sample.max_redraw_seconds, touch.max_redraw_seconds)
+        print('%4d h  %7d  %13.1f  %4d  %8d  %6d  %9.3f  %13d  %9.1f' % (
+            hrs, sample.runs + sample.redraws, sample.mean(sample.writes),
+            sample.max_writes, sample.redraws, sample.allocations,
+            sample.mean(sample.seconds) * 1000,
+            redraw_writes, redraw_seconds * 1000))
+        if sample.max_writes > MAX_WRITES_PER_SAMPLE:
+            print('FAIL: %d h sample writes %d pixels, budget %d' % (
+                hrs, sample.max_writes, MAX_WRITES_PER_SAMPLE))
+            failed = True
+        if redraw_writes > MAX_WRITES_PER_REDRAW:
+            print('FAIL: %d h redraw writes %d pixels, budget %d' % (
+                hrs, redraw_writes, MAX_WRITES_PER_REDRAW))
+            failed = True
+        allowed = MAX_RESCALE_FRACTION * (sample.runs + sample.redraws)
+        if hrs == RANGES[0]:
+            allowed += STARTUP_RESCALES
+        if sample.redraws > allowed:
+            print('FAIL: %d h redraws the whole chart on %d of %d samples' % (
+                hrs, sample.redraws, sample.runs + sample.redraws))
+            failed = True
+        if sample.allocations:
+            print('FAIL: %d h allocates %d displayio objects while sampling' % (
+                hrs, sample.allocations))
+            failed = True
+
+    ball = Stats()
+    for (name, hrs), s in stats.items():
+        if name == 'ball':
+            ball.writes += s.writes
+            ball.runs += s.runs
+    print('ball: %d frames, %.1f writes/frame' % (ball.runs, ball.mean(ball.writes)))
+    if failed:
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
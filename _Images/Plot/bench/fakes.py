@@ -0,0 +1,306 @@
+'''
+CES 20211018
+CPython stand-ins for the CircuitPython modules the plotter imports, so
+Plot/v2/code.py can run on a Linux host.
+
+The displayio classes count pixel writes and object allocations in
+`counters`. Sensors return synthetic values driven by a virtual clock,
+and the touchscreen reports a touch at scripted times.
+'''
+
+import math
+import sys
+import time
+import types
+
+counters = {
+    'pixel_writes': 0,
+    'allocations': 0,
+    'text_updates': 0,
+}
+
+
+def reset():
+    for key in counters:
+        counters[key] = 0
+
+
+class StopBench(Exception):
+    """Raised by the virtual clock when the run is over."""
+
+
+class VirtualClock:
+    """Monotonic clock that only moves when the app sleeps."""
+
+    def __init__(self, end):
+        self.now = 0.0
+        self.end = end
+
+    def monotonic(self):
+        return self.now
+
+    def monotonic_ns(self):
+        return round(self.now * 1000000000)
+
+    def sleep(self, seconds):
+        self.now += seconds
+        if self.now >= self.end:
+            raise StopBench()
+
+    def time(self):
+        return 1634000000 + int(self.now)
+
+
+################################################################################
+
+
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        counters['allocations'] += 1
+        self.width = width
+        self.height = height
+        self._data = bytearray(width * height)
+
+    def _index(self, key):
+        if isinstance(key, int):
+            if not 0 <= key < len(self._data):
+                raise IndexError(key)
+            return key
+        x, y = key
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise IndexError(key)
+        return y * self.width + x
+
+    def __setitem__(self, key, value):
+        counters['pixel_writes'] += 1
+        self._data[self._index(key)] = value
+
+    def __getitem__(self, key):
+        return self._data[self._index(key)]
+
+    def fill(self, value):
+        counters['pixel_writes'] += len(self._data)
+        for i in range(len(self._data)):
+            self._data[i] = value
+
+
+class Palette:
+    def __init__(self, color_count):
+        counters['allocations'] += 1
+        self._colors = [0] * color_count
+        self._transparent = set()
+
+    def __setitem__(self, index, color):
+        self._colors[index] = color
+
+    def __getitem__(self, index):
+        return self._colors[index]
+
+    def __len__(self):
+        return len(self._colors)
+
+    def make_transparent(self, index):
+        self._transparent.add(index)
+
+    def make_opaque(self, index):
+        self._transparent.discard(index)
+
+
+class TileGrid:
+    def __init__(self, bitmap, pixel_shader=None, width=1, height=1,
+                 tile_width=None, tile_height=None, default_tile=0, x=0, y=0):
+        counters['allocations'] += 1
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.x = x
+        self.y = y
+        self.hidden = False
+
+
+class Group(list):
+    def __init__(self, x=0, y=0, scale=1, max_size=None):
+        counters['allocations'] += 1
+        super().__init__()
+        self.x = x
+        self.y = y
+        self.scale = scale
+        self.hidden = False
+
+
+class Label:
+    def __init__(self, font, text='', color=0xFFFFFF, **kwargs):
+        counters['allocations'] += 1
+        self._text = text
+        self.color = color
+        self.x = 0
+        self.y = 0
+        self.hidden = False
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        counters['text_updates'] += 1
+        self._text = value
+
+
+class Display:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def show(self, group):
+        pass
+
+    def refresh(self, **kwargs):
+        pass
+
+
+################################################################################
+
+
+class BME680:
+    """Temperature swings 10 C over a virtual day."""
+
+    clock = None
+
+    def __init__(self, i2c, **kwargs):
+        pass
+
+    @property
+    def temperature(self):
+        return 22 + 5 * math.sin(self.clock.now * 2 * math.pi / 86400)
+
+    humidity = 45.0
+    pressure = 1013.0
+    gas = 50000
+
+
+class AnalogIn:
+    """Light follows the sun over a virtual day."""
+
+    clock = None
+
+    def __init__(self, pin):
+        pass
+
+    @property
+    def value(self):
+        day = math.sin(self.clock.now * 2 * math.pi / 86400)
+        return int(32767 + 30000 * day)
+
+
+class Touchscreen:
+    """Reports one touch at each time in `touches`."""
+
+    clock = None
+    touches = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    @property
+    def touch_point(self):
+        if self.touches and self.clock.now >= self.touches[0]:
+            self.touches.pop(0)
+            return (10, 10, 20000)
+        return None
+
+
+class Logger:
+    """adafruit_logging's Logger: checks the level, then formats with %."""
+
+    def __init__(self):
+        self.level = 0
+        self.lines = 0
+
+    def setLevel(self, level):
+        self.level = level
+
+    def log(self, level, msg, *args):
+        if level >= self.level:
+            self.lines += 1
+            msg % args
+
+    def debug(self, msg, *args):
+        self.log(10, msg, *args)
+
+    def info(self, msg, *args):
+        self.log(20, msg, *args)
+
+    def warning(self, msg, *args):
+        self.log(30, msg, *args)
+
+    def error(self, msg, *args):
+        self.log(40, msg, *args)
+
+
+_loggers = {}
+
+
+def getLogger(name):
+    return _loggers.setdefault(name, Logger())
+
+
+class SDCard:
+    def __init__(self, spi, cs):
+        raise OSError('No SD card on the host')
+
+
+################################################################################
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    for key, value in attrs.items():
+        setattr(module, key, value)
+    sys.modules[name] = module
+    return module
+
+
+def install(clock, width=480, height=320, touches=()):
+    """Register the stand-ins in sys.modules and point time at the clock.
+
+    Returns a function that restores the time module.
+    """
+    BME680.clock = clock
+    AnalogIn.clock = clock
+    Touchscreen.clock = clock
+    Touchscreen.touches = sorted(touches)
+
+    pins = dict((name, name) for name in (
+        'TOUCH_XL', 'TOUCH_XR', 'TOUCH_YD', 'TOUCH_YU', 'LIGHT',
+        'SCL', 'SDA', 'SCK', 'MOSI', 'MISO', 'SD_CS'))
+    _module('board', DISPLAY=Display(width, height), I2C=lambda: None,
+            SPI=lambda: None, **pins)
+    _module('displayio', Bitmap=Bitmap, Palette=Palette, TileGrid=TileGrid,
+            Group=Group)
+    _module('terminalio', FONT=None)
+    text = _module('adafruit_display_text')
+    text.label = _module('adafruit_display_text.label', Label=Label)
+    _module('adafruit_touchscreen', Touchscreen=Touchscreen)
+    _module('adafruit_bme680', Adafruit_BME680_I2C=BME680)
+    _module('analogio', AnalogIn=AnalogIn)
+    _module('digitalio', DigitalInOut=lambda pin: pin, Direction=None,
+            Pull=None)
+    _module('busio', SPI=lambda *args, **kwargs: None,
+            I2C=lambda *args, **kwargs: None)
+    _module('storage', mount=lambda *args: None,
+            VfsFat=lambda *args: None)
+    _module('adafruit_sdcard', SDCard=SDCard)
+    _module('adafruit_logging', DEBUG=10, INFO=20, WARNING=30, ERROR=40,
+            getLogger=getLogger)
+
+    saved = (time.monotonic, time.monotonic_ns, time.sleep, time.time)
+    time.monotonic = clock.monotonic
+    time.monotonic_ns = clock.monotonic_ns
+    time.sleep = clock.sleep
+    time.time = clock.time
+
+    def restore():
+        (time.monotonic, time.monotonic_ns, time.sleep,
+         time.time) = saved
+
+    return restore
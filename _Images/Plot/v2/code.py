@@ -1,10 +1,13 @@
 '''
 https://github.com/cmontalvo251/Microcontrollers/blob/master/PyPortal/temp_light_plotter.py
 '''
+import os
 import board
 import displayio
 import time
 import busio
+import storage
+import adafruit_sdcard
 
 #import adafruit_adt7410
 
@@ -16,41 +19,147 @@ import adafruit_touchscreen
 
 import adafruit_bme680
 
+from primitives import fill
+from stripchart import draw_column, ChartHistory, SlidingExtreme, AutoAxis
+from readout import Readout
+from samplelog import SampleLog
+from scheduler import Scheduler
+
 display = board.DISPLAY
 
 # Create a bitmap with three colors
 bitmap = displayio.Bitmap(display.width, display.height, 4)
 time_sleep = 0
-time_next = 0
 time_range_hrs = 2
 
+#Samples are always taken at the rate of the shortest range and kept
+#aggregated for every range, so a range change can redraw the chart from memory
+MIN_RANGE_HRS = 2
+MAX_RANGE_HRS = 24
+sample_sleep = MIN_RANGE_HRS*60*60/display.width
+history = ChartHistory(display.width,MAX_RANGE_HRS//MIN_RANGE_HRS)
+print("History bytes = ",history.nbytes)
+
+#Samples are logged to the SD card and replayed at boot
+LOG_DIR = "/sd/log"
+#Temperature in hundredths of a degree, light halved to fit an int16
+LOG_SCALES = (100,0.5)
+
+def open_sample_log():
+    try:
+        spi = busio.SPI(board.SCK, MOSI=board.MOSI, MISO=board.MISO)
+        sdcard = adafruit_sdcard.SDCard(spi, DigitalInOut(board.SD_CS))
+        storage.mount(storage.VfsFat(sdcard), "/sd")
+        try:
+            os.mkdir(LOG_DIR)
+        except OSError:
+            pass
+    except (OSError, ValueError) as err:
+        print("No SD card, samples will not be logged: ",err)
+        return None
+    return SampleLog(LOG_DIR,"plot_",LOG_SCALES)
+
+sample_log = open_sample_log()
+
 # You will usually have to add an offset to account for the temperature of
 # the sensor. This is usually around 5 degrees but varies by use. Use a
 # separate temperature sensor to calibrate this one.
 temperature_offset = -2.5
 
 def clear():
-    for x in range(0,display.width):
-        for y in range(0,display.height):
-            bitmap[x,y] = 0
+    fill(bitmap,0)
 
 def createText(level,maxval,minval,x,incolor):
     val = int(level*(maxval-minval)+minval)
-    textobj = label.Label(terminalio.FONT,text=str(val),color=incolor)
-    textobj.x = int(x*display.width)
-    textobj.y = int((1-level)*display.height)
-    return textobj
+    return Readout("%-5d",(val,),int(x*display.width),int((1-level)*display.height),incolor)
+
+def update_ticks():
+    #Rewrite the tick labels in place for the current axes
+    for level,text in zip(TICK_LEVELS,temp_texts):
+        text.update(int(level*(tempmax-tempmin)+tempmin))
+    for level,text in zip(TICK_LEVELS,light_texts):
+        text.update(int(level*(lightmax-lightmin)+lightmin))
 
 def change_time(time_range_hrs):
     global time_sleep
     #time_range_hrs = 8.0
     #time_next = 0
     time_sleep = time_range_hrs*60*60/display.width
-    time_range_text = label.Label(terminalio.FONT,text="R = " + str(time_range_hrs)+" h "+"S = "+str(int(time_sleep))+" s",color=WHITE)
-    time_range_text.x = int(0.1*display.width)
-    time_range_text.y = int(0.1*display.height)
+    time_range_text.update(time_range_hrs,int(time_sleep))
     print("Sleep Range = ",time_sleep)
-    return time_range_text
+
+def samples_per_column():
+    return int(time_range_hrs//MIN_RANGE_HRS)
+
+def ypixels(temperature_farenheit,light):
+    ypixel_temp = int((temperature_farenheit-tempmin)*tempslope+display.height)
+    ypixel_light = int((light-lightmin)/lightstep)
+    ##Flip the axes
+    ypixel_light = display.height - ypixel_light
+    return ypixel_temp,ypixel_light
+
+def draw_sample_column(x,column):
+    #Draw the min to max band of chart column number column
+    vals = history.column(samples_per_column(),column)
+    if vals is None:
+        draw_column(bitmap, x, display.height, [])
+        return
+    tmin,tmax,tmean,lmin,lmax,lmean = vals
+    ypixel_tmin,ypixel_lmin = ypixels(tmin,lmin)
+    ypixel_tmax,ypixel_lmax = ypixels(tmax,lmax)
+    #Temp is drawn last so it wins over light
+    draw_column(bitmap, x, display.height,
+                [(ypixel_lmin, ypixel_lmax, line_height, 1),
+                 (ypixel_tmin, ypixel_tmax, line_height, 2)])
+
+def redraw_chart():
+    #Lay the history out leftwards from ctr, newest column at ctr
+    column = (history.count-1)//samples_per_column()
+    for i in range(display.width):
+        draw_sample_column((ctr-i) % display.width,column-i)
+    scroll_chart()
+
+def push_window(column,tmin,tmax,lmin,lmax):
+    #Track the min/max of the columns on screen
+    temp_low.push(column,tmin)
+    temp_high.push(column,tmax)
+    light_low.push(column,lmin)
+    light_high.push(column,lmax)
+    oldest = column-display.width+1
+    for window in windows:
+        window.expire(oldest)
+
+def rebuild_window():
+    #Refill the min/max window from the history after a range change
+    for window in windows:
+        window.clear()
+    k = samples_per_column()
+    column = (history.count-1)//k
+    for c in range(column-display.width+1,column+1):
+        vals = history.column(k,c)
+        if vals is not None:
+            push_window(c,vals[0],vals[1],vals[3],vals[4])
+
+def rescale():
+    #Move the axes if the data on screen needs it, returns True if the chart
+    #has to be redrawn
+    global tempmin,tempmax,tempslope,lightmin,lightmax,lightstep
+    moved = temp_axis.update(temp_low.value,temp_high.value)
+    moved = light_axis.update(light_low.value,light_high.value) or moved
+    if not moved:
+        return False
+    tempmin,tempmax = temp_axis.low,temp_axis.high
+    tempslope = display.height/(tempmin-tempmax)
+    lightmin,lightmax = light_axis.low,light_axis.high
+    lightstep = (lightmax-lightmin)/display.height
+    print("Axes T = ",tempmin,tempmax," L = ",lightmin,lightmax)
+    update_ticks()
+    return True
+
+def scroll_chart():
+    #The bitmap is a circular buffer, move the TileGrid so column ctr is
+    #always at the right edge of the screen
+    tile_grid.x = -1-ctr
 
 BLACK = 0x000000
 WHITE = 0xffffff #Light color
@@ -64,8 +173,11 @@ palette[1] = LIGHTCOLOR
 palette[2] = TEMPCOLOR
 palette[3] = WHITE
 
-# Create a TileGrid using the Bitmap and Palette
-tile_grid = displayio.TileGrid(bitmap, pixel_shader=palette)
+# Create a TileGrid that shows the Bitmap twice side by side, so the chart
+# scrolls by moving the TileGrid instead of redrawing the Bitmap
+tile_grid = displayio.TileGrid(bitmap, pixel_shader=palette,
+                               width=2, height=1,
+                               tile_width=display.width, tile_height=display.height)
 
 # Create a Group
 group = displayio.Group()
@@ -73,35 +185,49 @@ group = displayio.Group()
 # Add the TileGrid to the Group
 group.append(tile_grid)
 
+#The ball is its own sprite so it stays put while the chart scrolls
+ball_bitmap = displayio.Bitmap(1, 1, 4)
+ball_bitmap[0,0] = 3
+ball = displayio.TileGrid(ball_bitmap, pixel_shader=palette, x=int(0.9*display.width))
+group.append(ball)
+
+#Starting axes, they rescale to the data on screen
 #Light step
+lightmin = 0.
 lightmax = 65536.
-lightstep = lightmax/display.height
+lightstep = (lightmax-lightmin)/display.height
 #Summer
 tempmax = 105.
 tempmin = 50.
-#Winter
-#tempmax = 75.
-#tempmin = 25.
 tempslope = display.height/(tempmin-tempmax)
 
+#Temperature snaps to 5 F and spans at least 10 F, light to 1/16 of full scale
+temp_axis = AutoAxis(tempmin,tempmax,5,10)
+light_axis = AutoAxis(lightmin,lightmax,4096,4096,0,65536)
+temp_low = SlidingExtreme(display.width,False)
+temp_high = SlidingExtreme(display.width)
+light_low = SlidingExtreme(display.width,False)
+light_high = SlidingExtreme(display.width)
+windows = (temp_low,temp_high,light_low,light_high)
+
 #Text
+TICK_LEVELS = [i/10. for i in range(1,10,4)]
 tempx = 0.8
 temp_texts = []
-for i in range(1,10,4):
-    print(i/10.)
-    temp_texts.append(createText(i/10.,tempmax,tempmin,tempx,TEMPCOLOR))
-    group.append(temp_texts[-1])
+for level in TICK_LEVELS:
+    temp_texts.append(createText(level,tempmax,tempmin,tempx,TEMPCOLOR))
+    group.append(temp_texts[-1].label)
 
 lightx = 0.7
 light_texts = []
-for i in range(1,10,4):
-    print(i/10.)
-    light_texts.append(createText(i/10.,lightmax,0,lightx,LIGHTCOLOR))
-    group.append(light_texts[-1])
+for level in TICK_LEVELS:
+    light_texts.append(createText(level,lightmax,lightmin,lightx,LIGHTCOLOR))
+    group.append(light_texts[-1].label)
 
 ###Make a grid now
-time_range_text = change_time(time_range_hrs)
-group.append(time_range_text)
+time_range_text = Readout("R = %2d h S = %3d s",(0,0),int(0.1*display.width),int(0.1*display.height),WHITE)
+change_time(time_range_hrs)
+group.append(time_range_text.label)
 
 #Setup light and temperature
 #i2c_bus = busio.I2C(board.SCL, board.SDA)
@@ -115,11 +241,9 @@ sensor = adafruit_bme680.Adafruit_BME680_I2C(i2c)
 adc = AnalogIn(board.LIGHT)
 
 ##Current Temperature and light value
-current_vals = label.Label(terminalio.FONT,text="L: "+str(adc.value)+" T: "+str(sensor.temperature),color=WHITE)
-current_vals.x = int(0.1*display.width)
-current_vals.y = int(0.2*display.height)
+current_vals = Readout("L: %5d T: %3d",(adc.value,int(sensor.temperature)),int(0.1*display.width),int(0.2*display.height),WHITE)
 # Add the Group to the Display
-group.append(current_vals)
+group.append(current_vals.label)
 
 ##THen finally show the group
 display.show(group)
@@ -131,76 +255,79 @@ line_height = 5
 ts = adafruit_touchscreen.Touchscreen(board.TOUCH_XL, board.TOUCH_XR,board.TOUCH_YD, board.TOUCH_YU)
 
 ctr = display.width-1
+if sample_log:
+    #Pre-populate the history from the log
+    for timestamp,values in sample_log.replay(history.capacity):
+        history.append(values[0],values[1])
+    print("Replayed samples = ",history.count)
+rebuild_window()
+rescale()
+redraw_chart()
 yball = 0
-time_start = time.monotonic()
-while 1:
+last_touch = None
+
+#Seconds to ignore the screen after a touch
+TOUCH_DEBOUNCE = 1.0
+
+def poll_touch():
+    global time_range_hrs,last_touch
     p = ts.touch_point
-    
-    if p:
-        print('Screen touched')
-        time_range_hrs += 2
-        if time_range_hrs > 24:
-            time_range_hrs = 2
-        current_vals = group[-1]
-        #pop the current vals
-        group.pop()
-        #pop the current labels
-        group.pop()
-        #Create a new label
-        time_range_text = change_time(time_range_hrs)
-        #Append the label
-        group.append(time_range_text)
-        #Append the current_vals
-        group.append(current_vals)
-        time.sleep(1)
-        
-    if time_next < (time.monotonic()-time_start):
-        print(time_next,time.monotonic()-time_start)
-        time_next += time_sleep
-        #Get temperature and light
-        light = adc.value
-        temperature_celsius = sensor.temperature + temperature_offset
-        temperature_farenheit = temperature_celsius*9.0/5.0 + 32.0
-        ypixel_temp = int((temperature_farenheit-tempmin)*tempslope+display.height)
-        ypixel_light = int(light/lightstep)
-        ##Flip the axes
-        ypixel_light = display.height - ypixel_light
-        print(temperature_farenheit,light,lightstep,tempslope,ypixel_temp,ypixel_light)
-        #Update the text
-        group.pop()
-        current_vals = label.Label(terminalio.FONT,text="L: "+str(light)+" T: "+str(int(temperature_farenheit)),color=WHITE)
-        current_vals.x = int(0.1*display.width)
-        current_vals.y = int(0.2*display.height)
-        group.append(current_vals)
-        #Clear bitmap
-        #Draw a pixel to indicate what column you are on
-        bitmap[ctr,0] = 0
-        bitmap[ctr,1] = 0
-        bitmap[ctr,2] = 0
+    if not p:
+        return
+    now = time.monotonic()
+    if last_touch is not None and now-last_touch < TOUCH_DEBOUNCE:
+        return
+    last_touch = now
+    print('Screen touched')
+    time_range_hrs += 2
+    if time_range_hrs > 24:
+        time_range_hrs = 2
+    #Update the range label in place
+    change_time(time_range_hrs)
+    #Rescale the history to the new range
+    rebuild_window()
+    rescale()
+    redraw_chart()
+
+def sample():
+    global ctr
+    #Get temperature and light
+    light = adc.value
+    temperature_celsius = sensor.temperature + temperature_offset
+    temperature_farenheit = temperature_celsius*9.0/5.0 + 32.0
+    history.append(temperature_farenheit,light)
+    push_window((history.count-1)//samples_per_column(),
+                temperature_farenheit,temperature_farenheit,light,light)
+    if sample_log:
+        sample_log.append(time.time(),(temperature_farenheit,light))
+    ypixel_temp,ypixel_light = ypixels(temperature_farenheit,light)
+    print(temperature_farenheit,light,lightstep,tempslope,ypixel_temp,ypixel_light)
+    #Update the text
+    current_vals.update(light,int(temperature_farenheit))
+    #Start a new column every samples_per_column() samples
+    if (history.count-1) % samples_per_column() == 0:
         ctr += 1
         if ctr >= display.width:
             ctr = 0
-            #Clear the screen
-            #clear()
-        for x in range(0,display.width):
-            for y in range(0,display.height):
-                if x == ctr and abs(y-ypixel_temp) < line_height:
-                    bitmap[x,y] = 2
-                elif x == ctr and abs(y-ypixel_light) < line_height:
-                    bitmap[x,y] = 1
-                elif x == ctr:
-                    bitmap[x,y] = 0
-        bitmap[ctr,0] = 3
-        bitmap[ctr,1] = 3
-        bitmap[ctr,2] = 3
-        
+        scroll_chart()
+    if rescale():
+        redraw_chart()
+    else:
+        #Redraw only the current column with the samples so far
+        draw_sample_column(ctr,(history.count-1)//samples_per_column())
+
+def drop_ball():
     ##Draw a ball dropping on the right side of the screen
-    xball = int(0.9*display.width)
-    bitmap[xball,yball] = 0
+    global yball
     yball += 1
     if yball >= display.height:
         yball = 0
-    bitmap[xball,yball] = 3
-    #Time sleep
-    #print(time_next,time.monotonic()-time_start)
-    time.sleep(0.01)
\ No newline at end of file
+    ball.y = yball
+
+scheduler = Scheduler()
+scheduler.add("sample",sample_sleep,sample)
+scheduler.add("touch",0.05,poll_touch)
+scheduler.add("ball",0.01,drop_ball)
+#Print missed deadlines and jitter every 10 minutes
+scheduler.add("report",600,scheduler.report,600)
+scheduler.run()
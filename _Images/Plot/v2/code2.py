@@ -6,7 +6,7 @@ import digitalio
 import busio
 import adafruit_sdcard
 import storage
-from adafruit_bitmapsaver import save_pixels
+from screenshot import Screenshot
 
 
 def plot():
@@ -15,18 +15,22 @@ def plot():
     lineplot = LinePlot([sines],'MicroPlot line')
     plotter = Plotter()
     lineplot.plot(plotter)
+    return plotter
 
 
-def save():
+def save(plotter):
     spi = busio.SPI(board.SCK, MOSI=board.MOSI, MISO=board.MISO)
     cs = digitalio.DigitalInOut(board.SD_CS)
     sdcard = adafruit_sdcard.SDCard(spi, cs)
     vfs = storage.VfsFat(sdcard)
     storage.mount(vfs, "/sd")
-    save_pixels("/sd/screenshot2.bmp")
+    #Streams the canvas a few rows per step, an app with a loop would
+    #call step once per pass instead
+    canvas = plotter.canvas
+    Screenshot("/sd/screenshot2.bmp", canvas.bitmap, canvas.palette).run()
 	
-plot()
-#save()
+plotter = plot()
+#save(plotter)
 print('done')
 
 #import jax.numpy as np
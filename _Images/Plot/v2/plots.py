@@ -14,12 +14,21 @@ Licensed under the MIT license.
 All text above must be included in any redistribution.
 """
 
+import array
 import gc
+import math
 import time
 import board
 import displayio
 import adafruit_logging as logging
+import logs
+from primitives import fill, fill_rect, hspan, vspan
 
+try:
+    from micropython import const
+except ImportError:
+    def const(x):
+        return x
 try:
     import adafruit_touchscreen
 except ImportError:
@@ -31,6 +40,10 @@ except ImportError:
     pass
 
 
+#Set to 0 to strip the per stroke debug logging, see logs.py
+_DEBUG = const(1)
+
+
 class Color(object):
     """Standard colors"""
 
@@ -53,8 +66,27 @@ class Color(object):
 ################################################################################
 
 
+#Touch sampling period and the ring buffer it fills between frames
+SAMPLE_TIME = 0.005
+TOUCH_BUFFER = 32
+#Filtered points closer than this to the last kept point are dropped
+MIN_MOVE = 2
+#Ring buffer entry marking the end of a touch
+PEN_UP = -1
+
+
+def _median3(a, b, c):
+    return max(min(a, b), min(max(a, b), c))
+
+
 class TouchscreenPoller(object):
-    """Get 'pressed' and location updates from a touch screen device."""
+    """Get 'pressed' and location updates from a touch screen device.
+
+    Besides poll, the screen can be read every SAMPLE_TIME with sample.
+    Samples are median filtered over the last three reads to drop the
+    spikes a resistive screen gives, coalesced, and kept in a ring buffer
+    until drain hands them over as stroke segments once a frame.
+    """
 
     def __init__(self, splash, cursor_bmp):
         logging.getLogger("Paint").debug("Creating a TouchscreenPoller")
@@ -65,19 +97,92 @@ class TouchscreenPoller(object):
             calibration=((9000, 59000), (8000, 57000)),
             size=(320, 240),
         )
+        #The cursor group stays on top of splash for good and only moves,
+        #so a cursor step dirties its old and new 9x9 areas and nothing else
         self._cursor_grp = displayio.Group()
         self._cur_palette = displayio.Palette(3)
         self._cur_palette.make_transparent(0)
         self._cur_palette[1] = 0xFFFFFF
         self._cur_palette[2] = 0x0000
-        self._cur_sprite = displayio.TileGrid(
-            cursor_bmp, pixel_shader=self._cur_palette
-        )
-        self._cursor_grp.append(self._cur_sprite)
+        self._cur_sprites = []
+        self._cur_sprite = self._cursor_sprite(cursor_bmp)
         self._display_grp.append(self._cursor_grp)
         self._x_offset = cursor_bmp.width // 2
         self._y_offset = cursor_bmp.height // 2
 
+        self._xs = array.array("h", [0] * TOUCH_BUFFER)
+        self._ys = array.array("h", [0] * TOUCH_BUFFER)
+        self._head = 0
+        self._count = 0
+        self._wx = array.array("h", [0, 0, 0])
+        self._wy = array.array("h", [0, 0, 0])
+        self._reads = 0
+        self._down = False
+        self._kept_x = 0
+        self._kept_y = 0
+        self._last = None
+
+    def _push(self, x, y):
+        newest = (self._head - 1) % TOUCH_BUFFER
+        if self._count == TOUCH_BUFFER:
+            #Drawing fell behind: stretch the last segment to the new point
+            #rather than lose the start of the stroke
+            if self._xs[newest] == PEN_UP:
+                return
+            self._xs[newest] = x
+            self._ys[newest] = y
+            return
+        self._xs[self._head] = x
+        self._ys[self._head] = y
+        self._head = (self._head + 1) % TOUCH_BUFFER
+        self._count += 1
+
+    def sample(self):
+        """Read the touchscreen once into the ring buffer."""
+        p = self._touchscreen.touch_point
+        if p is None:
+            if self._down:
+                self._down = False
+                self._reads = 0
+                self._push(PEN_UP, 0)
+            return
+        x = p[0]
+        y = p[1]
+        i = self._reads % 3
+        self._wx[i] = x
+        self._wy[i] = y
+        self._reads += 1
+        if self._reads >= 3:
+            x = _median3(self._wx[0], self._wx[1], self._wx[2])
+            y = _median3(self._wy[0], self._wy[1], self._wy[2])
+        if self._down and (abs(x - self._kept_x) < MIN_MOVE
+                           and abs(y - self._kept_y) < MIN_MOVE):
+            return
+        self._down = True
+        self._kept_x = x
+        self._kept_y = y
+        self._push(x, y)
+
+    def drain(self, segment):
+        """Hand the points sampled since the last drain to
+        segment(start, end), oldest first.
+
+        :param segment: called with the previous point and the next one,
+            start is None for the first point of a touch
+        """
+        i = (self._head - self._count) % TOUCH_BUFFER
+        for _ in range(self._count):
+            x = self._xs[i]
+            y = self._ys[i]
+            i = (i + 1) % TOUCH_BUFFER
+            if x == PEN_UP:
+                self._last = None
+                continue
+            end = (x, y)
+            segment(self._last, end)
+            self._last = end
+        self._count = 0
+
     def poll(self):
         """Check for input. Returns contact (a bool), False (no button B),
         and it's location ((x,y) or None)"""
@@ -90,23 +195,34 @@ class TouchscreenPoller(object):
         else:
             return False, None
 
+    def _cursor_sprite(self, bmp):
+        """The cursor TileGrid for bmp, created the first time it is shown
+        and hidden while another bitmap is in use."""
+        for bitmap, sprite in self._cur_sprites:
+            if bitmap is bmp:
+                return sprite
+        sprite = displayio.TileGrid(bmp, pixel_shader=self._cur_palette)
+        self._cur_sprites.append((bmp, sprite))
+        self._cursor_grp.append(sprite)
+        return sprite
+
     def poke(self, location=None):
-        """Force a bitmap refresh."""
-        self._display_grp.remove(self._cursor_grp)
+        """Move the cursor to location. Drawing on the bitmap is picked up
+        by the next display refresh, so nothing else needs touching."""
         if location is not None:
             self._cursor_grp.x = location[0] - self._x_offset
             self._cursor_grp.y = location[1] - self._y_offset
-        self._display_grp.append(self._cursor_grp)
 
     def set_cursor_bitmap(self, bmp):
         """Update the cursor bitmap.
 
         :param bmp: the new cursor bitmap
         """
-        self._cursor_grp.remove(self._cur_sprite)
-        self._cur_sprite = displayio.TileGrid(bmp, pixel_shader=self._cur_palette)
-        self._cursor_grp.append(self._cur_sprite)
-        self.poke()
+        sprite = self._cursor_sprite(bmp)
+        if sprite is not self._cur_sprite:
+            self._cur_sprite.hidden = True
+            sprite.hidden = False
+            self._cur_sprite = sprite
 
 
 ################################################################################
@@ -155,52 +271,282 @@ class CursorPoller(object):
 ################################################################################
 
 
+#Shortest time between display refreshes while a stroke is drawn, and
+#between the stroke batches drawn from touch samples
+FRAME_TIME = 1 / 60
+
+
+def _draw_cross(bitmap, x, y, thickness, color):
+    """Draw the 9x9 brush cross at (x, y), leaving its centre clear."""
+    lo = 4 - thickness // 2
+    hi = lo + thickness
+    fill_rect(bitmap, x + lo, y, x + hi, y + 9, color)
+    fill_rect(bitmap, x, y + lo, x + 9, y + hi, color)
+    fill_rect(bitmap, x + lo, y + lo, x + hi, y + hi, 0)
+
+
+def square_stamp(size):
+    """A size x size square brush stamp, centred on the pen."""
+    lo = -(size // 2)
+    return ((lo, lo, lo + size, lo + size),)
+
+
+def round_stamp(radius):
+    """A disc brush stamp of the given radius, centred on the pen."""
+    rects = []
+    for dy in range(-radius, radius + 1):
+        dx = int(math.sqrt(radius * radius + radius - dy * dy))
+        if rects and rects[-1][0] == -dx and rects[-1][3] == dy:
+            #Rows of the same width stack into one rectangle
+            rects[-1][3] = dy + 1
+        else:
+            rects.append([-dx, dy, dx + 1, dy + 1])
+    return tuple(tuple(r) for r in rects)
+
+
+#Brush stamps are lists of (x0, y0, x1, y1) rectangles relative to the pen,
+#so plotting one costs a fill per rectangle and clipping happens in
+#fill_rect rather than through IndexError. Indexed like the brush swatches.
+BRUSHES = (square_stamp(1), square_stamp(3))
+
+
+_cursor_bitmaps = []
+
+
+def cursor_bitmaps():
+    """The 1 and 3 pixel brush cursors, built on first use and shared by
+    every Paint."""
+    if not _cursor_bitmaps:
+        for thickness in (1, 3):
+            bmp = displayio.Bitmap(9, 9, 3)
+            _draw_cross(bmp, 0, 0, thickness, 1)
+            _cursor_bitmaps.append(bmp)
+    return _cursor_bitmaps
+
+
+def _draw_arrow(bitmap, x, y, left, color):
+    """Draw a 9x9 triangle at (x, y) pointing left or right."""
+    for r in range(9):
+        inset = 2 * abs(r - 4)
+        if left:
+            hspan(bitmap, x + inset, x + 9, y + r, color)
+        else:
+            hspan(bitmap, x, x + 9 - inset, y + r, color)
+
+
+def bitmap_bytes(bitmap, value_count):
+    """Approximate heap bytes for a displayio.Bitmap, which stores
+    1, 2, 4, 8, 16 or 32 bits per pixel in rows padded to 32 bits."""
+    bits = 1
+    while (1 << bits) < value_count:
+        bits *= 2
+    return (bitmap.width * bits + 31) // 32 * 4 * bitmap.height
+
+
+#Side of the square canvas tiles the undo journal copies
+UNDO_TILE = 16
+
+
+class UndoJournal(object):
+    """Copy-on-write undo history for a bitmap, kept per tile.
+
+    A stroke copies a tile the first time it touches it, so a stroke
+    costs only the tiles it drew on. Undo and redo swap those copies with
+    the bitmap, and cost the same area. Whole strokes are evicted oldest
+    first to keep the copies under max_bytes.
+    """
+
+    def __init__(self, bitmap, max_bytes, tile=UNDO_TILE):
+        self._bitmap = bitmap
+        self._max_bytes = max_bytes
+        self._tile = tile
+        self._columns = (bitmap.width + tile - 1) // tile
+        self._rows = (bitmap.height + tile - 1) // tile
+        self._saved = bytearray(self._columns * self._rows)
+        #Strokes are lists of (tile, copy), oldest stroke first
+        self._undo = []
+        self._redo = []
+        self._stroke = None
+        self._nbytes = 0
+
+    @property
+    def nbytes(self):
+        """Bytes held by tile copies."""
+        return self._nbytes
+
+    @property
+    def strokes(self):
+        """The number of strokes that can be undone."""
+        return len(self._undo) + (1 if self._stroke else 0)
+
+    def _size(self, stroke):
+        return sum(len(copy) for _, copy in stroke)
+
+    def _end(self):
+        if self._stroke is None:
+            return
+        for t, _ in self._stroke:
+            self._saved[t] = 0
+        if self._stroke:
+            self._undo.append(self._stroke)
+        self._stroke = None
+
+    def begin(self):
+        """Start recording a stroke. Strokes undone so far can no longer
+        be redone."""
+        self._end()
+        for stroke in self._redo:
+            self._nbytes -= self._size(stroke)
+        self._redo = []
+        self._stroke = []
+
+    def forget(self):
+        """Drop the whole history, for when the canvas is cleared."""
+        self._end()
+        self._undo = []
+        self._redo = []
+        self._nbytes = 0
+
+    def _bounds(self, t):
+        x0 = t % self._columns * self._tile
+        y0 = t // self._columns * self._tile
+        return (x0, y0, min(x0 + self._tile, self._bitmap.width),
+                min(y0 + self._tile, self._bitmap.height))
+
+    def _copy(self, t):
+        x0, y0, x1, y1 = self._bounds(t)
+        bitmap = self._bitmap
+        width = bitmap.width
+        copy = bytearray((x1 - x0) * (y1 - y0))
+        k = 0
+        for row in range(y0 * width, y1 * width, width):
+            for i in range(row + x0, row + x1):
+                copy[k] = bitmap[i]
+                k += 1
+        return copy
+
+    def _swap(self, stroke):
+        bitmap = self._bitmap
+        width = bitmap.width
+        for t, copy in stroke:
+            x0, y0, x1, y1 = self._bounds(t)
+            k = 0
+            for row in range(y0 * width, y1 * width, width):
+                for i in range(row + x0, row + x1):
+                    value = bitmap[i]
+                    bitmap[i] = copy[k]
+                    copy[k] = value
+                    k += 1
+
+    def touch(self, x0, y0, x1, y1):
+        """Save the tiles under the rectangle x0 <= x < x1, y0 <= y < y1
+        that this stroke has not saved yet. Call before drawing."""
+        if self._stroke is None:
+            return
+        x0 = max(x0, 0)
+        y0 = max(y0, 0)
+        x1 = min(x1, self._bitmap.width)
+        y1 = min(y1, self._bitmap.height)
+        if x1 <= x0 or y1 <= y0:
+            return
+        tile = self._tile
+        for ty in range(y0 // tile, (y1 - 1) // tile + 1):
+            for t in range(ty * self._columns + x0 // tile,
+                           ty * self._columns + (x1 - 1) // tile + 1):
+                if not self._saved[t]:
+                    self._saved[t] = 1
+                    copy = self._copy(t)
+                    self._stroke.append((t, copy))
+                    self._nbytes += len(copy)
+        if self._nbytes > self._max_bytes:
+            self._evict()
+
+    def _evict(self):
+        while self._nbytes > self._max_bytes and self._undo:
+            self._nbytes -= self._size(self._undo.pop(0))
+        if self._nbytes > self._max_bytes and self._stroke:
+            #This stroke alone is over the cap, stop recording it
+            self._nbytes -= self._size(self._stroke)
+            for t, _ in self._stroke:
+                self._saved[t] = 0
+            self._stroke = None
+
+    def undo(self):
+        """Undo the last stroke, returns False if there is none."""
+        self._end()
+        if not self._undo:
+            return False
+        stroke = self._undo.pop()
+        self._swap(stroke)
+        self._redo.append(stroke)
+        return True
+
+    def redo(self):
+        """Redo the last undone stroke, returns False if there is none."""
+        self._end()
+        if not self._redo:
+            return False
+        stroke = self._redo.pop()
+        self._swap(stroke)
+        self._undo.append(stroke)
+        return True
+
+
 class Paint(object):
-    def __init__(self, display=board.DISPLAY):
-        self._logger = logging.getLogger("Paint")
-        self._logger.setLevel(logging.DEBUG)
+    def __init__(self, display=board.DISPLAY, plot_only=False,
+                 background=Color.BLACK, undo_bytes=16384,
+                 log_level=logging.INFO):
+        """:param display: the display to draw on
+        :param plot_only: a canvas for plots with no swatches, cursor or
+            touch input, which saves the swatch and cursor bitmaps
+        :param background: the canvas colour, set through palette index 0
+            of the drawing bitmap instead of a separate background bitmap
+        :param undo_bytes: memory cap for the undo history, 0 for none.
+            plot_only canvases keep no history.
+        :param log_level: the Paint logger level, logging.DEBUG logs every
+            stroke
+        """
+        start = time.monotonic()
+        self._logger = logs.getLogger("Paint", log_level)
         self._display = display
+        self._plot_only = plot_only
         self._w = self._display.width
         self._h = self._display.height
         self._x = self._w // 2
         self._y = self._h // 2
+        self._nbytes = 0
 
         self._splash = displayio.Group()
 
-        self._bg_bitmap = displayio.Bitmap(self._w, self._h, 1)
-        self._bg_palette = displayio.Palette(1)
-        self._bg_palette[0] = Color.BLACK
-        self._bg_sprite = displayio.TileGrid(
-            self._bg_bitmap, pixel_shader=self._bg_palette, x=0, y=0
-        )
-        self._splash.append(self._bg_sprite)
-
-        self._palette_bitmap = displayio.Bitmap(self._w, self._h, 5)
-        self._palette_palette = displayio.Palette(len(Color.colors))
-        for i, c in enumerate(Color.colors):
-            self._palette_palette[i] = c
-        self._palette_sprite = displayio.TileGrid(
-            self._palette_bitmap, pixel_shader=self._palette_palette, x=0, y=0
-        )
-        self._splash.append(self._palette_sprite)
-
-        self._fg_bitmap = displayio.Bitmap(self._w, self._h, 5)
+        self._fg_bitmap = displayio.Bitmap(self._w, self._h, len(Color.colors))
+        self._nbytes += bitmap_bytes(self._fg_bitmap, len(Color.colors))
         self._fg_palette = displayio.Palette(len(Color.colors))
         for i, c in enumerate(Color.colors):
             self._fg_palette[i] = c
+        self._fg_palette[0] = background
         self._fg_sprite = displayio.TileGrid(
             self._fg_bitmap, pixel_shader=self._fg_palette, x=0, y=0
         )
         self._splash.append(self._fg_sprite)
 
-        self._number_of_palette_options = len(Color.colors) + 2
-        self._swatch_height = self._h // self._number_of_palette_options
-        self._swatch_width = self._w // 10
-        self._logger.debug("Height: %d", self._h)
-        self._logger.debug("Swatch height: %d", self._swatch_height)
+        self._journal = None
+        if undo_bytes and not plot_only:
+            self._journal = UndoJournal(self._fg_bitmap, undo_bytes)
 
-        self._palette = self._make_palette()
-        self._splash.append(self._palette)
+        self._brush = 0
+        self._stamp = BRUSHES[0]
+        self._poller = None
+        if not plot_only:
+            #Colours, two brushes, undo and redo
+            self._number_of_palette_options = len(Color.colors) + 4
+            self._swatch_height = self._h // self._number_of_palette_options
+            self._swatch_width = self._w // 10
+            self._logger.debug("Height: %d", self._h)
+            self._logger.debug("Swatch height: %d", self._swatch_height)
+
+            self._palette = self._make_palette()
+            self._nbytes += bitmap_bytes(self._palette_bitmap, len(Color.colors))
+            self._splash.append(self._palette)
 
         self._display.show(self._splash)
         try:
@@ -211,14 +557,14 @@ class Paint(object):
             gc.collect()
             self._display.wait_for_frame()
 
-        self._brush = 0
-        self._cursor_bitmaps = [self._cursor_bitmap_1(), self._cursor_bitmap_3()]
-        if hasattr(board, "TOUCH_XL"):
-            self._poller = TouchscreenPoller(self._splash, self._cursor_bitmaps[0])
-        elif hasattr(board, "BUTTON_CLOCK"):
-            self._poller = CursorPoller(self._splash, self._cursor_bitmaps[0])
-        else:
-            raise AttributeError("PyPaint requires a touchscreen or cursor.")
+        if not plot_only:
+            self._cursor_bitmaps = cursor_bitmaps()
+            if hasattr(board, "TOUCH_XL"):
+                self._poller = TouchscreenPoller(self._splash, self._cursor_bitmaps[0])
+            elif hasattr(board, "BUTTON_CLOCK"):
+                self._poller = CursorPoller(self._splash, self._cursor_bitmaps[0])
+            else:
+                raise AttributeError("PyPaint requires a touchscreen or cursor.")
 
         self._a_pressed = False
         self._last_a_pressed = False
@@ -226,88 +572,197 @@ class Paint(object):
         self._last_location = None
 
         self._pencolor = 7
+        self._last_refresh = 0
+        self._startup_ms = (time.monotonic() - start) * 1000
+        self._logger.info("Canvas bytes: %d, startup %d ms", self._nbytes,
+                          self._startup_ms)
+
+    @property
+    def nbytes(self):
+        """Bytes allocated for the canvas and swatch bitmaps."""
+        return self._nbytes
+
+    @property
+    def startup_ms(self):
+        """Milliseconds spent building the canvas."""
+        return self._startup_ms
+
+    @property
+    def plot_area(self):
+        """The (left, top, right, bottom) of the canvas plots can use."""
+        if self._plot_only:
+            return 0, 0, self._w, self._h
+        return self._w // 10, 0, self._w, self._h
+
+    @property
+    def stamp(self):
+        """The brush stamp plotted at each point, see square_stamp and
+        round_stamp."""
+        return self._stamp
+
+    @stamp.setter
+    def stamp(self, stamp):
+        self._stamp = stamp
+
+    @property
+    def bitmap(self):
+        """The indexed bitmap plots are drawn on."""
+        return self._fg_bitmap
+
+    @property
+    def palette(self):
+        """The palette of bitmap."""
+        return self._fg_palette
+
+    @property
+    def undo_nbytes(self):
+        """Bytes held by the undo history."""
+        return self._journal.nbytes if self._journal else 0
+
+    def clear(self):
+        """Erase everything drawn on the canvas."""
+        fill(self._fg_bitmap, 0)
+        if self._journal:
+            self._journal.forget()
+
+    def undo(self):
+        """Undo the last stroke, returns False if there is none."""
+        if not self._journal:
+            return False
+        done = self._journal.undo()
+        self._logger.debug("Undo: %d strokes, %d bytes", self._journal.strokes,
+                           self._journal.nbytes)
+        return done
+
+    def redo(self):
+        """Redo the last undone stroke, returns False if there is none."""
+        if not self._journal:
+            return False
+        done = self._journal.redo()
+        self._logger.debug("Redo: %d strokes, %d bytes", self._journal.strokes,
+                           self._journal.nbytes)
+        return done
 
     def _make_palette(self):
         self._palette_bitmap = displayio.Bitmap(self._w // 10, self._h, 5)
         self._palette_palette = displayio.Palette(len(Color.colors))
         for i, c in enumerate(Color.colors):
             self._palette_palette[i] = c
-            for y in range(self._swatch_height):
-                for x in range(self._swatch_width):
-                    self._palette_bitmap[x, self._swatch_height * i + y] = i
+            fill_rect(self._palette_bitmap, 0, self._swatch_height * i,
+                      self._swatch_width, self._swatch_height * (i + 1), i)
 
         swatch_x_offset = (self._swatch_width - 9) // 2
         swatch_y_offset = (self._swatch_height - 9) // 2
         swatch_y = self._swatch_height * len(Color.colors) + swatch_y_offset
-        for i in range(9):
-            self._palette_bitmap[swatch_x_offset + 4, swatch_y + i] = 1
-            self._palette_bitmap[swatch_x_offset + i, swatch_y + 4] = 1
-            self._palette_bitmap[swatch_x_offset + 4, swatch_y + 4] = 0
-
+        _draw_cross(self._palette_bitmap, swatch_x_offset, swatch_y, 1, 1)
+        swatch_y += self._swatch_height
+        _draw_cross(self._palette_bitmap, swatch_x_offset, swatch_y, 3, 1)
         swatch_y += self._swatch_height
-        for i in range(9):
-            self._palette_bitmap[swatch_x_offset + 3, swatch_y + i] = 1
-            self._palette_bitmap[swatch_x_offset + 4, swatch_y + i] = 1
-            self._palette_bitmap[swatch_x_offset + 5, swatch_y + i] = 1
-            self._palette_bitmap[swatch_x_offset + i, swatch_y + 3] = 1
-            self._palette_bitmap[swatch_x_offset + i, swatch_y + 4] = 1
-            self._palette_bitmap[swatch_x_offset + i, swatch_y + 5] = 1
-        for i in range(swatch_x_offset + 3, swatch_x_offset + 6):
-            for j in range(swatch_y + 3, swatch_y + 6):
-                self._palette_bitmap[i, j] = 0
-
-        for i in range(self._h):
-            self._palette_bitmap[self._swatch_width - 1, i] = 7
+        _draw_arrow(self._palette_bitmap, swatch_x_offset, swatch_y, True, 1)
+        swatch_y += self._swatch_height
+        _draw_arrow(self._palette_bitmap, swatch_x_offset, swatch_y, False, 1)
+
+        vspan(self._palette_bitmap, self._swatch_width - 1, 0, self._h, 7)
 
         return displayio.TileGrid(
             self._palette_bitmap, pixel_shader=self._palette_palette, x=0, y=0
         )
 
-    def _cursor_bitmap_1(self):
-        bmp = displayio.Bitmap(9, 9, 3)
-        for i in range(9):
-            bmp[4, i] = 1
-            bmp[i, 4] = 1
-        bmp[4, 4] = 0
-        return bmp
-
-    def _cursor_bitmap_3(self):
-        bmp = displayio.Bitmap(9, 9, 3)
-        for i in range(9):
-            bmp[3, i] = 1
-            bmp[4, i] = 1
-            bmp[5, i] = 1
-            bmp[i, 3] = 1
-            bmp[i, 4] = 1
-            bmp[i, 5] = 1
-        for i in range(3, 6):
-            for j in range(3, 6):
-                bmp[i, j] = 0
-        return bmp
+    def _refresh(self, force=False):
+        """Show what has been drawn, at most once every FRAME_TIME unless
+        forced, while auto refresh is off for a stroke."""
+        now = time.monotonic()
+        if force or now - self._last_refresh >= FRAME_TIME:
+            self._last_refresh = now
+            self._display.refresh(target_frames_per_second=None)
 
     def _plot(self, x, y, c):
-        if self._brush == 0:
-            r = [0]
-        else:
-            r = [-1, 0, 1]
-        for i in r:
-            for j in r:
-                try:
-                    self._fg_bitmap[int(x + i), int(y + j)] = c
-                except IndexError:
-                    pass
-
-    def _draw_line(self, start, end):
+        x = int(x)
+        y = int(y)
+        for x0, y0, x1, y1 in self._stamp:
+            if self._journal:
+                self._journal.touch(x + x0, y + y0, x + x1, y + y1)
+            fill_rect(self._fg_bitmap, x + x0, y + y0, x + x1, y + y1, c)
+
+    def _plot_run(self, a, b, c, steep, color):
+        """Plot pixels a..b-1 of a line run at minor coordinate c with the
+        current brush. The stamp swept along the run is one rectangle fill
+        per stamp rectangle."""
+        b -= 1
+        for x0, y0, x1, y1 in self._stamp:
+            if steep:
+                x0, y0, x1, y1 = c + x0, a + y0, c + x1, b + y1
+            else:
+                x0, y0, x1, y1 = a + x0, c + y0, b + x1, c + y1
+            if self._journal:
+                self._journal.touch(x0, y0, x1, y1)
+            fill_rect(self._fg_bitmap, x0, y0, x1, y1, color)
+
+    def _raster_line(self, start, end):
+        """Draw a line in one pass without animating it.
+
+        The Bresenham run is split into straight runs of pixels, each one
+        written as a single span, and the cursor moves once at the end.
+
+        :param start: a tuple of (x, y) coordinates to draw from
+        :param end: a tuple of (x, y) coordinates to draw to
+        """
+        x0, y0 = int(start[0]), int(start[1])
+        x1, y1 = int(end[0]), int(end[1])
+        steep = abs(y1 - y0) > abs(x1 - x0)
+        if steep:
+            x0, y0 = y0, x0
+            x1, y1 = y1, x1
+        #Same stepping as the animated loop so both draw the same pixels
+        xstep = -1 if x0 > x1 else 1
+        ystep = 1 if y0 < y1 else -1
+        dx = abs(x1 - x0)
+        dy = abs(y1 - y0)
+        err = dx / 2
+        run_start = x0
+        for x in range(x0, x1 + xstep, xstep):
+            err -= dy
+            if err < 0 or x == x1:
+                self._plot_run(min(run_start, x), max(run_start, x) + 1, y0,
+                               steep, self._pencolor)
+                run_start = x + xstep
+                if err < 0:
+                    y0 += ystep
+                    err += dx
+        self._x = end[0]
+        self._y = end[1]
+        if self._poller:
+            self._poller.poke((int(end[0]), int(end[1])))
+
+    def _draw_line(self, start, end, animate=True):
         """Draw a line from the previous position to the current one.
 
         :param start: a tuple of (x, y) coordinatess to fram from
         :param end: a tuple of (x, y) coordinates to draw to
+        :param animate: move the cursor along the line pixel by pixel, when
+            False the line is drawn in one pass by _raster_line
         """
         x0 = start[0]
         y0 = start[1]
         x1 = end[0]
         y1 = end[1]
-        self._logger.debug("* GoTo from (%d, %d) to (%d, %d)", x0, y0, x1, y1)
+        if _DEBUG and self._logger.debug_on:
+            self._logger.debug("* GoTo from (%d, %d) to (%d, %d)", x0, y0, x1, y1)
+        if not animate:
+            self._raster_line(start, end)
+            return
+        #Batch the pixel steps into one refresh per frame instead of
+        #letting auto refresh pick up each cursor move
+        auto_refresh = self._display.auto_refresh
+        self._display.auto_refresh = False
+        try:
+            self._animate_line(x0, y0, x1, y1)
+            self._refresh(True)
+        finally:
+            self._display.auto_refresh = auto_refresh
+
+    def _animate_line(self, x0, y0, x1, y1):
+        """Step the cursor along the line, drawing as it goes."""
         steep = abs(y1 - y0) > abs(x1 - x0)
         rev = False
         dx = x1 - x0
@@ -329,22 +784,18 @@ class Paint(object):
 
         while (not rev and x0 <= x1) or (rev and x1 <= x0):
             if steep:
-                try:
-                    self._plot(int(y0), int(x0), self._pencolor)
-                except IndexError:
-                    pass
+                self._plot(y0, x0, self._pencolor)
                 self._x = y0
                 self._y = x0
                 self._poller.poke((int(y0), int(x0)))
+                self._refresh()
                 time.sleep(0.003)
             else:
-                try:
-                    self._plot(int(x0), int(y0), self._pencolor)
-                except IndexError:
-                    pass
+                self._plot(x0, y0, self._pencolor)
                 self._x = x0
                 self._y = y0
                 self._poller.poke((int(x0), int(y0)))
+                self._refresh()
                 time.sleep(0.003)
             err -= dy
             if err < 0:
@@ -359,29 +810,48 @@ class Paint(object):
         selected = location[1] // self._swatch_height
         if selected >= self._number_of_palette_options:
             return
-        self._logger.debug("Palette selection: %d", selected)
+        if _DEBUG and self._logger.debug_on:
+            self._logger.debug("Palette selection: %d", selected)
         if selected < len(Color.colors):
             self._pencolor = selected
+        elif selected == len(Color.colors) + 2:
+            self.undo()
+        elif selected == len(Color.colors) + 3:
+            self.redo()
         else:
             self._brush = selected - len(Color.colors)
+            self._stamp = BRUSHES[self._brush]
             self._poller.set_cursor_bitmap(self._cursor_bitmaps[self._brush])
 
-    def _handle_motion(self, start, end):
-        self._logger.debug(
-            "Moved: (%d, %d) -> (%d, %d)", start[0], start[1], end[0], end[1]
-        )
-        self._draw_line(start, end)
+    def _handle_motion(self, start, end, animate=True):
+        if _DEBUG and self._logger.debug_on:
+            self._logger.debug(
+                "Moved: (%d, %d) -> (%d, %d)", start[0], start[1], end[0], end[1]
+            )
+        self._draw_line(start, end, animate)
+
+    def _handle_segment(self, start, end):
+        """Draw one stroke segment drained from the touch ring buffer."""
+        if start is None:
+            self._handle_a_press(end)
+            self._poller.poke(end)
+        else:
+            self._handle_motion(start, end, animate=False)
 
     def _handle_a_press(self, location):
-        self._logger.debug("A Pressed!")
+        if _DEBUG and self._logger.debug_on:
+            self._logger.debug("A Pressed!")
         if location[0] < self._w // 10:  # in color picker
             self._handle_palette_selection(location)
         else:
+            if self._journal:
+                self._journal.begin()
             self._plot(location[0], location[1], self._pencolor)
             self._poller.poke()
 
     def _handle_a_release(self, location):
-        self._logger.debug("A Released!")
+        if _DEBUG and self._logger.debug_on:
+            self._logger.debug("A Released!")
 
     @property
     def _was_a_just_pressed(self):
@@ -406,8 +876,13 @@ class Paint(object):
 
     def run(self, time_to_run = None):
         """Run the painting program."""
+        if self._poller is None:
+            raise RuntimeError("A plot_only Paint has no input to run.")
         start_time = time.monotonic()
-        
+        if isinstance(self._poller, TouchscreenPoller):
+            self._run_touch(start_time, time_to_run)
+            return
+
         while True:
             #CES 20211012 - If ttr > value exit
             if time_to_run and (time.monotonic() - start_time) > time_to_run:
@@ -422,6 +897,21 @@ class Paint(object):
                 self._handle_motion(self._last_location, self._location)
             time.sleep(0.1)
 
+    def _run_touch(self, start_time, time_to_run):
+        """Sample the touchscreen every SAMPLE_TIME and draw the strokes
+        gathered once a frame, so lines follow the finger while the
+        drawing cost stays at one batch per frame."""
+        frame_end = start_time
+        while True:
+            now = time.monotonic()
+            if time_to_run and (now - start_time) > time_to_run:
+                break
+            self._poller.sample()
+            if now >= frame_end:
+                frame_end = now + FRAME_TIME
+                self._poller.drain(self._handle_segment)
+            time.sleep(SAMPLE_TIME)
+
 
                     
 '''
@@ -429,45 +919,252 @@ CES 20211014
 Display LinePlot
 '''
        
-class LinePlot:
+def _color(i):
+    """Pen colour of series i, skipping black, the background colour."""
+    return 1 + i % (len(Color.colors) - 1)
+
+
+def _xy(series):
+    """Iterate a series as (x, y) points. A series of plain y values is
+    enumerated in place rather than copied, logged series are long."""
+    if len(series) and not isinstance(series[0], tuple):
+        return enumerate(series)
+    return series
+
+
+def _column_points(column, first, low, high, last):
+    """The (index, row) points kept for one column, in their order."""
+    kept = [first]
+    for point in sorted((low, high)):
+        if point[0] > kept[-1][0]:
+            kept.append(point)
+    if last[0] > kept[-1][0]:
+        kept.append(last)
+    for _, row in kept:
+        yield column, row
+
+
+def _column_extremes(pixels):
+    """Reduce pixel points to at most four per column: the first, top,
+    bottom and last, in the order they came.
+
+    Inside a column the line only runs up and down, so those four draw
+    the same pixels as the full series, and a series with more points
+    than the canvas has columns draws in time bounded by the width.
+    """
+    column = None
+    for i, (x, y) in enumerate(pixels):
+        if x != column:
+            if column is not None:
+                yield from _column_points(column, first, low, high, last)
+            column = x
+            first = low = high = (i, y)
+        elif y < low[1]:
+            low = (i, y)
+        elif y > high[1]:
+            high = (i, y)
+        last = (i, y)
+    if column is not None:
+        yield from _column_points(column, first, low, high, last)
+
+
+class _Scale:
+    """Maps data coordinates onto the plot area of the canvas."""
+
+    def __init__(self, area, xmin, xmax, ymin, ymax):
+        self.left, self.top, self.right, self.bottom = area
+        self.xmin = xmin
+        self.ymin = ymin
+        self.xscale = (self.right - self.left - 1) / (xmax - xmin)
+        self.yscale = (self.bottom - self.top - 1) / (ymax - ymin)
+
+    def point(self, x, y):
+        return self.left + int((x - self.xmin) * self.xscale), self.row(y)
+
+    def row(self, y):
+        return self.bottom - 1 - int((y - self.ymin) * self.yscale)
+
+
+class _Plot:
+    """Series handling, bounds and canvas setup shared by the plot types,
+    so each type only adds its one drawing pass over the data."""
     _title = None
     _points = None
     _plotter = None
 
     def __init__(self, points, title):
+        """:param points: a list of series, each a list of y values or of
+            (x, y) tuples
+        :param title: the plot title
+        """
         self._title =  title
         self._points = points
-		
-		
-    #lineplot.plot(plotter)
-    def plot(self):
-        pass
-        
-        
-    def plot(self, plotter):
+
+    def _series(self):
+        for series in self._points:
+            yield _xy(series)
+
+    def _bounds(self):
+        """Return (xmin, xmax, ymin, ymax) over all series, (0, 1, 0, 1)
+        when they are all empty."""
+        xmin = ymin = None
+        xmax = ymax = None
+        for series in self._series():
+            for x, y in series:
+                if xmin is None or x < xmin:
+                    xmin = x
+                if xmax is None or x > xmax:
+                    xmax = x
+                if ymin is None or y < ymin:
+                    ymin = y
+                if ymax is None or y > ymax:
+                    ymax = y
+        if xmin is None:
+            return 0, 1, 0, 1
+        if xmin == xmax:
+            xmax = xmin + 1
+        if ymin == ymax:
+            ymax = ymin + 1
+        return xmin, xmax, ymin, ymax
+
+    def _begin(self, plotter, bounds):
+        """Clear the plotter's canvas, returns it and the scale that maps
+        bounds onto its plot area."""
         self._plotter = plotter
-        
+        canvas = plotter.canvas
+        canvas.clear()
+        return canvas, _Scale(canvas.plot_area, *bounds)
+
+
+class LinePlot(_Plot):
+    def plot(self, plotter):
+        """Scale the series to the plotter's canvas and draw them."""
+        canvas, scale = self._begin(plotter, self._bounds())
+        columns = scale.right - scale.left
+        for i, series in enumerate(self._points):
+            canvas._pencolor = _color(i)
+            points = (scale.point(x, y) for x, y in _xy(series))
+            if len(series) > columns:
+                points = _column_extremes(points)
+            prev = None
+            for p in points:
+                if prev is not None:
+                    canvas._raster_line(prev, p)
+                prev = p
         gc.collect()
-        print("GC")
-        
-        painter = Paint()
-        #painter._splash.pop()
-        
-        l = [(0, 160), (50, 170), (100, 150), (400, 100), (450,200), (480, 320)]
-        
-        prev = l.pop(0)
-        p = l.pop(0)
-        
-        while p:
-            painter._draw_line(prev, p)
-            prev = p
-            
-            try:
-                p = l.pop(0)
-            except IndexError:
-                break
-        
-        
-        #painter.run(10)
 
-       
\ No newline at end of file
+
+class ScatterPlot(_Plot):
+    def __init__(self, points, title, stamp=BRUSHES[1]):
+        """:param points: a list of series, each a list of y values or of
+            (x, y) tuples
+        :param title: the plot title
+        :param stamp: the brush stamp marking each point
+        """
+        super().__init__(points, title)
+        self._stamp = stamp
+
+    def plot(self, plotter):
+        """Scale the series to the plotter's canvas and mark each point."""
+        canvas, scale = self._begin(plotter, self._bounds())
+        stamp = canvas.stamp
+        canvas.stamp = self._stamp
+        try:
+            for i, series in enumerate(self._series()):
+                color = _color(i)
+                for x, y in series:
+                    px, py = scale.point(x, y)
+                    canvas._plot(px, py, color)
+        finally:
+            canvas.stamp = stamp
+        gc.collect()
+
+
+class BarPlot(_Plot):
+    def __init__(self, points, title, gap=1):
+        """:param points: a list of series, each a list of y values, one
+            bar per value, with the series side by side in each category
+        :param title: the plot title
+        :param gap: pixels left between neighbouring bars
+        """
+        super().__init__(points, title)
+        self._gap = gap
+
+    def _bounds(self):
+        """Return (0, categories, ymin, ymax), with 0 kept in the y range
+        so the bars rise or hang from it."""
+        categories = 1
+        ymin = ymax = 0
+        for series in self._points:
+            if len(series) > categories:
+                categories = len(series)
+            for y in series:
+                if y < ymin:
+                    ymin = y
+                if y > ymax:
+                    ymax = y
+        if ymin == ymax:
+            ymax = ymin + 1
+        return 0, categories, ymin, ymax
+
+    def plot(self, plotter):
+        """Scale the bars to the plotter's canvas and fill each one."""
+        bounds = self._bounds()
+        canvas, scale = self._begin(plotter, bounds)
+        bitmap = canvas._fg_bitmap
+        width = (scale.right - scale.left) / bounds[1]
+        count = len(self._points)
+        base = scale.row(0)
+        for s, series in enumerate(self._points):
+            color = _color(s)
+            for i, y in enumerate(series):
+                x0 = scale.left + int(i * width + s * width / count)
+                x1 = scale.left + int(i * width + (s + 1) * width / count)
+                x1 = max(x0 + 1, x1 - self._gap)
+                row = scale.row(y)
+                fill_rect(bitmap, x0, min(row, base), x1, max(row, base) + 1,
+                          color)
+        gc.collect()
+
+
+class HistogramPlot(BarPlot):
+    def __init__(self, low, high, bins, title):
+        """Counts samples into bins as they arrive, so the distribution of
+        a day's readings costs one counter per bin instead of every sample.
+
+        :param low: the bottom of the first bin
+        :param high: the top of the last bin, samples outside low..high
+            are counted in the end bins
+        :param bins: the number of bins
+        :param title: the plot title
+        """
+        self._counts = array.array("L", [0] * bins)
+        super().__init__([self._counts], title, gap=0)
+        self._low = low
+        self._bin_width = (high - low) / bins
+        self._total = 0
+
+    @property
+    def counts(self):
+        return self._counts
+
+    @property
+    def total(self):
+        """Samples added since the last clear."""
+        return self._total
+
+    def add(self, value):
+        """Count one sample."""
+        i = int((value - self._low) / self._bin_width)
+        if i < 0:
+            i = 0
+        elif i >= len(self._counts):
+            i = len(self._counts) - 1
+        self._counts[i] += 1
+        self._total += 1
+
+    def clear(self):
+        """Start a new distribution, say at midnight."""
+        for i in range(len(self._counts)):
+            self._counts[i] = 0
+        self._total = 0
@@ -1,6 +1,234 @@
+'''
+CES 20211018
+Plotter owns the surfaces plots are drawn on.
+
+canvas is a full screen Paint for LinePlot. Series charts share one
+indexed bitmap and palette instead: each series gets its own palette
+slot, the axes and legend are drawn once, and changing a series redraws
+only the series it crosses. A series is erased by clearing just the
+pixels still holding its slot, then it and every series whose rows
+overlap what changed are drawn again in slot order, so the series it
+was drawn over are restored and later series stay on top.
+'''
+
+import array
+import board
+import displayio
+import terminalio
+from adafruit_display_text import label
+from primitives import fill_rect, hspan, vspan
+
+BACKGROUND = 0
+AXIS = 1
+#Palette slots from FIRST_SLOT up are handed out to series
+FIRST_SLOT = 2
+MAX_SERIES = 6
+#Axis ticks at every quarter, and the room left for them
+TICKS = 4
+MARGIN = 4
+LEGEND_LINE = 12
+
+
+def _erase_rect(bitmap, x0, y0, x1, y1, slot):
+	"""Clear the pixels of the rectangle that are still set to slot."""
+	width = bitmap.width
+	for row in range(y0 * width, y1 * width, width):
+		for i in range(row + x0, row + x1):
+			if bitmap[i] == slot:
+				bitmap[i] = BACKGROUND
+
+
+class Series:
+	"""A series of values scaled from low..high onto the chart, kept in a
+	ring of capacity values, and the rows it was last drawn at."""
+	def __init__(self, name, color, low, high, slot, capacity):
+		self.name = name
+		self.color = color
+		self.low = low
+		self.high = high
+		self.slot = slot
+		self.values = array.array('f', [0] * capacity)
+		self.first = 0
+		self.count = 0
+		self.rows = array.array('h', [0] * capacity)
+		self.drawn = 0
+		#The rows the drawn line covers, top > bottom while nothing is
+		self.top = 0
+		self.bottom = -1
+
+	def append(self, value):
+		capacity = len(self.values)
+		if self.count < capacity:
+			self.values[(self.first + self.count) % capacity] = value
+			self.count += 1
+		else:
+			self.values[self.first] = value
+			self.first = (self.first + 1) % capacity
+
+	def set(self, values):
+		capacity = len(self.values)
+		values = values[-capacity:]
+		for i, value in enumerate(values):
+			self.values[i] = value
+		self.first = 0
+		self.count = len(values)
 
 
 class Plotter:
-	def __init__(self):
+	"""Owns the canvas plots are drawn on, so replots reuse it, and the
+	shared series chart."""
+	def __init__(self, width=None, height=None, x=0, y=0, capacity=None,
+				 axis_color=0xFFFFFF, background=0x000000):
+		"""
+		:param width: chart width, the display width by default
+		:param height: chart height, the display height by default
+		:param x: chart position in its parent group
+		:param y: chart position in its parent group
+		:param capacity: values held per series, one per column by default
+		"""
 		self._name = "PlotterCS"
-		
\ No newline at end of file
+		self._canvas = None
+		self._width = width or board.DISPLAY.width
+		self._height = height or board.DISPLAY.height
+		self._left = MARGIN
+		self._bottom = self._height - MARGIN
+		self._plot_width = self._width - self._left
+		self._plot_height = self._bottom
+		self._capacity = capacity or self._plot_width
+		self._group = displayio.Group(x=x, y=y)
+		self._bitmap = None
+		self._palette = displayio.Palette(FIRST_SLOT + MAX_SERIES)
+		self._palette[BACKGROUND] = background
+		self._palette[AXIS] = axis_color
+		self._series = []
+
+	@property
+	def canvas(self):
+		if self._canvas is None:
+			#plots is only needed here, apps that only chart series can
+			#ship without it
+			from plots import Paint
+			self._canvas = Paint(plot_only=True)
+		return self._canvas
+
+	@property
+	def group(self):
+		"""The chart, for the app to add to its display group."""
+		return self._group
+
+	def _make_chart(self):
+		"""Allocate the chart bitmap and draw the axes and ticks once."""
+		self._bitmap = displayio.Bitmap(self._width, self._height,
+										FIRST_SLOT + MAX_SERIES)
+		self._group.append(displayio.TileGrid(self._bitmap,
+											  pixel_shader=self._palette))
+		left = self._left
+		bottom = self._bottom
+		vspan(self._bitmap, left - 1, 0, bottom + 1, AXIS)
+		hspan(self._bitmap, left - 1, self._width, bottom, AXIS)
+		for i in range(TICKS + 1):
+			y = bottom - 1 - i * (self._plot_height - 1) // TICKS
+			hspan(self._bitmap, 0, left - 1, y, AXIS)
+			x = left + i * (self._plot_width - 1) // TICKS
+			vspan(self._bitmap, x, bottom + 1, self._height, AXIS)
+
+	def add_series(self, name, color, low, high):
+		"""Give a series a palette slot and a legend entry.
+
+		:param name: the legend text
+		:param color: the series colour
+		:param low: the value drawn at the bottom of the chart
+		:param high: the value drawn at the top of the chart
+		:returns: the series index for update and append
+		"""
+		if len(self._series) >= MAX_SERIES:
+			raise ValueError("A chart holds at most %d series" % MAX_SERIES)
+		if self._bitmap is None:
+			self._make_chart()
+		index = len(self._series)
+		slot = FIRST_SLOT + index
+		self._palette[slot] = color
+		self._series.append(Series(name, color, low, high, slot,
+								   self._capacity))
+		legend = label.Label(terminalio.FONT,
+							 text="{} {:g}-{:g}".format(name, low, high),
+							 color=color)
+		legend.x = self._left + 2
+		legend.y = LEGEND_LINE // 2 + index * LEGEND_LINE
+		self._group.append(legend)
+		return index
+
+	def update(self, index, values):
+		"""Replace the values of a series and redraw it and the series it
+		crosses."""
+		series = self._series[index]
+		series.set(values)
+		self._redraw(series)
+
+	def append(self, index, value):
+		"""Add a value to a series, scrolling it once it is full, and
+		redraw it and the series it crosses."""
+		series = self._series[index]
+		series.append(value)
+		self._redraw(series)
+
+	def _row(self, series, value):
+		top = self._bottom - 1
+		row = top - int((value - series.low) * (self._plot_height - 1)
+						/ (series.high - series.low))
+		if row < 0:
+			return 0
+		if row > top:
+			return top
+		return row
+
+	def _spans(self, rows, count, draw, slot):
+		"""Draw a step line through rows as spans: across at the previous
+		row to the next point, then up or down to its row."""
+		step = (self._plot_width - 1) / max(1, self._capacity - 1)
+		if not count:
+			return
+		x0 = self._left
+		prev = rows[0]
+		draw(self._bitmap, x0, prev, x0 + 1, prev + 1, slot)
+		for i in range(1, count):
+			x = self._left + int(i * step)
+			row = rows[i]
+			if x > x0 + 1:
+				draw(self._bitmap, x0 + 1, prev, x, prev + 1, slot)
+			draw(self._bitmap, x, min(prev, row), x + 1, max(prev, row) + 1, slot)
+			x0 = x
+			prev = row
+
+	def _redraw(self, series):
+		self._spans(series.rows, series.drawn, _erase_rect, series.slot)
+		top = series.top
+		bottom = series.bottom
+		capacity = len(series.values)
+		for i in range(series.count):
+			series.rows[i] = self._row(
+				series, series.values[(series.first + i) % capacity])
+		series.drawn = series.count
+		if series.drawn:
+			series.top = min(series.rows[:series.drawn])
+			series.bottom = max(series.rows[:series.drawn])
+		else:
+			series.top = 0
+			series.bottom = -1
+		if top > bottom:
+			top = series.top
+			bottom = series.bottom
+		else:
+			top = min(top, series.top)
+			bottom = max(bottom, series.bottom)
+		#The erase cleared pixels of series drawn under this one, and
+		#redrawing any series covers the ones after it. Draw again, in
+		#slot order, every series whose rows meet the rows changed so far.
+		for other in self._series:
+			if other is not series and (other.top > other.bottom
+					or other.bottom < top or other.top > bottom):
+				continue
+			self._spans(other.rows, other.drawn, fill_rect, other.slot)
+			if other.top <= other.bottom:
+				top = min(top, other.top)
+				bottom = max(bottom, other.bottom)
@@ -0,0 +1,65 @@
+'''
+CES 20211018
+Bulk fill primitives for displayio Bitmaps.
+
+bitmaptools does the work in C where the firmware has it. Otherwise the
+fallback writes through the Bitmap's flat index, which skips building an
+(x, y) tuple for every pixel.
+'''
+
+try:
+    import bitmaptools
+except ImportError:
+    bitmaptools = None
+
+
+def fill(bitmap, value):
+    """Set every pixel of the bitmap to value."""
+    try:
+        bitmap.fill(value)
+    except AttributeError:
+        fill_rect(bitmap, 0, 0, bitmap.width, bitmap.height, value)
+
+
+def fill_rect(bitmap, x0, y0, x1, y1, value):
+    """Fill the rectangle x0 <= x < x1, y0 <= y < y1, clipped to the bitmap."""
+    if x0 < 0:
+        x0 = 0
+    if y0 < 0:
+        y0 = 0
+    if x1 > bitmap.width:
+        x1 = bitmap.width
+    if y1 > bitmap.height:
+        y1 = bitmap.height
+    if x1 <= x0 or y1 <= y0:
+        return
+    if bitmaptools:
+        bitmaptools.fill_region(bitmap, x0, y0, x1, y1, value)
+        return
+    width = bitmap.width
+    for row in range(y0 * width, y1 * width, width):
+        for i in range(row + x0, row + x1):
+            bitmap[i] = value
+
+
+def hspan(bitmap, x0, x1, y, value):
+    """Fill row y from x0 up to but not including x1."""
+    fill_rect(bitmap, x0, y, x1, y + 1, value)
+
+
+def vspan(bitmap, x, y0, y1, value):
+    """Fill column x from y0 up to but not including y1."""
+    if x < 0 or x >= bitmap.width:
+        return
+    if y0 < 0:
+        y0 = 0
+    if y1 > bitmap.height:
+        y1 = bitmap.height
+    if y1 <= y0:
+        return
+    if bitmaptools:
+        bitmaptools.fill_region(bitmap, x, y0, x + 1, y1, value)
+        return
+    width = bitmap.width
+    for i in range(y0 * width + x, y1 * width + x, width):
+        bitmap[i] = value
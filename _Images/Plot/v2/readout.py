@@ -0,0 +1,29 @@
+'''
+CES 20211018
+Text readout that is created once and rewritten in place.
+'''
+
+import terminalio
+from adafruit_display_text import label
+
+
+class Readout:
+    """A Label whose text comes from a fixed width format string.
+
+    The Label is built once. update() only touches it when the values
+    change, and the fixed width keeps the glyph count constant so the
+    Label can reuse its glyph TileGrids instead of allocating new ones.
+    """
+
+    def __init__(self, fmt, values, x, y, color, font=terminalio.FONT):
+        self._fmt = fmt
+        self._values = values
+        self.label = label.Label(font, text=fmt % values, color=color)
+        self.label.x = x
+        self.label.y = y
+
+    def update(self, *values):
+        if values == self._values:
+            return
+        self._values = values
+        self.label.text = self._fmt % values
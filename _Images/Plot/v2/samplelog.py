@@ -0,0 +1,249 @@
+'''
+CES 20211018
+Append-only binary sample log.
+
+Each segment file starts with a header:
+    magic b'SLOG', version (B), channel count (B), reserved (H), start
+    time (I, seconds), then one scale (f) per channel.
+followed by fixed size records:
+    seconds since the previous record (H), then one int16 per channel
+    holding round(value * scale).
+
+Records are buffered in RAM and written in batches. A new segment is
+started on every boot and whenever the current one is full, and the
+oldest segments are removed past max_segments.
+
+Runs on CircuitPython and CPython, so log files copied off the SD card
+can be decoded on a host with:
+    python3 samplelog.py <directory> [prefix]
+Without a prefix every <prefix><index>.bin group in the directory is
+decoded, one group after another.
+'''
+
+import os
+import struct
+
+MAGIC = b'SLOG'
+VERSION = 1
+HEADER = '<4sBBHI'
+HEADER_SIZE = struct.calcsize(HEADER)
+MAX_DELTA = 65535
+INT16_MIN = -32768
+INT16_MAX = 32767
+
+
+def _record_format(channels):
+    return '<H' + 'h' * channels
+
+
+def _clamp(value):
+    if value < INT16_MIN:
+        return INT16_MIN
+    if value > INT16_MAX:
+        return INT16_MAX
+    return value
+
+
+def _segment_index(name, prefix):
+    """Return the index of segment file name, None if it is not one."""
+    if not (name.startswith(prefix) and name.endswith('.bin')):
+        return None
+    digits = name[len(prefix):-4]
+    if not digits.isdigit():
+        return None
+    return int(digits)
+
+
+def segment_prefixes(directory):
+    """Return the prefixes of the segment groups in directory, sorted.
+    The prefix is a segment's name less its trailing digits."""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    prefixes = []
+    for name in names:
+        if not name.endswith('.bin'):
+            continue
+        stem = name[:-4]
+        end = len(stem)
+        while end > 0 and stem[end - 1].isdigit():
+            end -= 1
+        if end < len(stem) and stem[:end] not in prefixes:
+            prefixes.append(stem[:end])
+    prefixes.sort()
+    return prefixes
+
+
+def list_segments(directory, prefix):
+    """Return the segment paths for prefix in directory, oldest first.
+
+    Segments are ordered by their index as a number, the names stop
+    sorting as strings once the index outgrows its four digits.
+    """
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    indexed = []
+    for name in names:
+        index = _segment_index(name, prefix)
+        if index is not None:
+            indexed.append((index, name))
+    indexed.sort()
+    return [directory + '/' + name for _, name in indexed]
+
+
+def read_header(f):
+    """Read a segment header, returns (start_time, scales)."""
+    data = f.read(HEADER_SIZE)
+    if len(data) < HEADER_SIZE:
+        raise ValueError('Truncated header')
+    magic, version, channels, _, start = struct.unpack(HEADER, data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Not a sample log segment')
+    scales = struct.unpack('<' + 'f' * channels, f.read(4 * channels))
+    return start, scales
+
+
+def read_segment(path, skip=0):
+    """Yield (timestamp, values) for each record in a segment file,
+    after skipping the first skip records."""
+    with open(path, 'rb') as f:
+        start, scales = read_header(f)
+        fmt = _record_format(len(scales))
+        size = struct.calcsize(fmt)
+        timestamp = start
+        if skip:
+            #Deltas of skipped records still count towards the timestamp
+            for _ in range(skip):
+                data = f.read(size)
+                if len(data) < size:
+                    return
+                timestamp += struct.unpack_from('<H', data)[0]
+        while True:
+            data = f.read(size)
+            if len(data) < size:
+                return
+            record = struct.unpack(fmt, data)
+            timestamp += record[0]
+            yield timestamp, tuple(v / s for v, s in zip(record[1:], scales))
+
+
+class SampleLog:
+    """Batched writer for a rotating set of log segments."""
+
+    def __init__(self, directory, prefix, scales, flush_every=16,
+                 segment_records=4096, max_segments=8):
+        self._directory = directory
+        self._prefix = prefix
+        self._scales = tuple(scales)
+        self._fmt = _record_format(len(self._scales))
+        self._record_size = struct.calcsize(self._fmt)
+        self._flush_every = flush_every
+        self._segment_records = segment_records
+        self._max_segments = max_segments
+        self._buffer = bytearray(self._record_size * flush_every)
+        self._buffered = 0
+        self._segment = None
+        self._segment_count = 0
+        self._last_time = None
+
+    @property
+    def record_size(self):
+        return self._record_size
+
+    def segments(self):
+        return list_segments(self._directory, self._prefix)
+
+    def _segment_size(self, path):
+        header = HEADER_SIZE + 4 * len(self._scales)
+        return (os.stat(path)[6] - header) // self._record_size
+
+    def _start_segment(self, timestamp):
+        segments = self.segments()
+        index = 0
+        if segments:
+            last = segments[-1][len(self._directory) + 1:]
+            index = _segment_index(last, self._prefix) + 1
+        self._segment = '%s/%s%04d.bin' % (self._directory, self._prefix, index)
+        self._segment_count = 0
+        with open(self._segment, 'wb') as f:
+            f.write(struct.pack(HEADER, MAGIC, VERSION, len(self._scales), 0,
+                                int(timestamp)))
+            f.write(struct.pack('<' + 'f' * len(self._scales), *self._scales))
+        segments.append(self._segment)
+        while len(segments) > self._max_segments:
+            os.remove(segments.pop(0))
+
+    def append(self, timestamp, values):
+        """Log one sample, values has one entry per channel."""
+        if self._segment is None or self._segment_count >= self._segment_records:
+            self.flush()
+            self._start_segment(timestamp)
+            self._last_time = int(timestamp)
+        delta = int(timestamp) - self._last_time
+        if delta < 0:
+            delta = 0
+        elif delta > MAX_DELTA:
+            delta = MAX_DELTA
+        self._last_time += delta
+        struct.pack_into(self._fmt, self._buffer,
+                         self._buffered * self._record_size, delta,
+                         *[_clamp(int(round(v * s)))
+                           for v, s in zip(values, self._scales)])
+        self._buffered += 1
+        self._segment_count += 1
+        if self._buffered >= self._flush_every:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered records to the current segment."""
+        if not self._buffered:
+            return
+        with open(self._segment, 'ab') as f:
+            f.write(memoryview(self._buffer)[:self._buffered * self._record_size])
+        self._buffered = 0
+
+    def replay(self, limit=None):
+        """Yield (timestamp, values) for the logged samples, oldest first.
+        With limit only the newest limit samples are read."""
+        segments = self.segments()
+        skip = 0
+        if limit is not None:
+            #Walk back from the newest segment until enough records are held
+            first = len(segments)
+            held = 0
+            while first > 0 and held < limit:
+                first -= 1
+                held += self._segment_size(segments[first])
+            segments = segments[first:]
+            skip = max(0, held - limit)
+        for i, path in enumerate(segments):
+            try:
+                for sample in read_segment(path, skip if i == 0 else 0):
+                    yield sample
+            except (OSError, ValueError) as err:
+                print('Skipping log segment', path, err)
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2:
+        print('usage: python3 samplelog.py <directory> [prefix]')
+        sys.exit(2)
+    directory = sys.argv[1]
+    if len(sys.argv) > 2:
+        prefixes = [sys.argv[2]]
+    else:
+        prefixes = segment_prefixes(directory)
+    paths = []
+    for prefix in prefixes:
+        paths.extend(list_segments(directory, prefix))
+    if not paths:
+        print('No log segments in', directory)
+        sys.exit(1)
+    for path in paths:
+        for timestamp, values in read_segment(path):
+            print(','.join([str(timestamp)] + ['%g' % v for v in values]))
@@ -0,0 +1,94 @@
+'''
+CES 20211018
+Deadline scheduler for periodic tasks.
+
+Each task keeps an absolute deadline that advances by its period, so
+late runs do not push later ones back and the sampling rate does not
+drift. Between tasks the loop sleeps until the next deadline instead of
+polling.
+
+Deadlines are integer nanoseconds from time.monotonic_ns. The float from
+time.monotonic loses millisecond resolution after an hour or so of
+uptime, and then adding a short period to a deadline stops advancing it
+correctly.
+'''
+
+import time
+
+NS_PER_S = 1000000000
+NS_PER_MS = 1000000
+
+
+class Task:
+    """A callback run every period, with period and deadline in ns."""
+
+    def __init__(self, name, period, callback, deadline):
+        self.name = name
+        self.period = period
+        self.callback = callback
+        self.deadline = deadline
+        self.runs = 0
+        self.missed = 0
+        self.max_late = 0
+        self.total_late = 0
+
+    def run(self, now):
+        late = now - self.deadline
+        if late > self.max_late:
+            self.max_late = late
+        self.total_late += late
+        self.runs += 1
+        self.deadline += self.period
+        if self.deadline <= now:
+            #Skip the deadlines that already passed rather than bursting
+            skipped = int((now - self.deadline) // self.period) + 1
+            self.missed += skipped
+            self.deadline += skipped * self.period
+        self.callback()
+
+
+class Scheduler:
+    """Runs tasks at their deadlines using a monotonic clock.
+
+    :param clock: returns the time in integer nanoseconds
+    :param sleep: sleeps for a time in seconds
+    """
+
+    def __init__(self, clock=time.monotonic_ns, sleep=time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._tasks = []
+
+    @property
+    def tasks(self):
+        return self._tasks
+
+    def add(self, name, period, callback, delay=0):
+        """Run callback every period seconds, the first time after delay."""
+        task = Task(name, round(period * NS_PER_S), callback,
+                    self._clock() + round(delay * NS_PER_S))
+        self._tasks.append(task)
+        return task
+
+    def run_once(self):
+        """Run every task that is due, then sleep until the next deadline."""
+        now = self._clock()
+        for task in self._tasks:
+            if task.deadline <= now:
+                task.run(now)
+                now = self._clock()
+        next_deadline = min(task.deadline for task in self._tasks)
+        if next_deadline > now:
+            self._sleep((next_deadline - now) / NS_PER_S)
+
+    def run(self):
+        while True:
+            self.run_once()
+
+    def report(self):
+        """Print runs, missed deadlines and lateness (jitter) per task."""
+        for task in self._tasks:
+            mean_late = task.total_late / task.runs if task.runs else 0
+            print("{}: runs {} missed {} late mean {:.1f} ms max {:.1f} ms".format(
+                task.name, task.runs, task.missed,
+                mean_late / NS_PER_MS, task.max_late / NS_PER_MS))
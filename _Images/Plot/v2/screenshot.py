@@ -0,0 +1,88 @@
+'''
+CES 20211018
+Streaming screenshot of an indexed bitmap to an 8-bit palettised BMP.
+
+save_pixels reads the whole display back as 24-bit colour in one call
+and stalls the app for seconds. Screenshot writes the bitmap's own
+palette indexes instead, one byte per pixel, a few rows per step
+through one reused row buffer. The app can call step once per loop, or
+from a scheduler task, and keep sampling and handling touch while the
+file is written:
+
+    shot = Screenshot("/sd/plot.bmp", canvas.bitmap, canvas.palette)
+    ...
+    if shot and shot.step():
+        shot = None
+'''
+
+import struct
+
+FILE_HEADER = '<2sIHHI'
+INFO_HEADER = '<IiiHHIIiiII'
+HEADERS_SIZE = struct.calcsize(FILE_HEADER) + struct.calcsize(INFO_HEADER)
+
+
+class Screenshot:
+    """Writes bitmap and palette to path, rows_per_step rows at a time."""
+
+    def __init__(self, path, bitmap, palette, rows_per_step=8):
+        self._path = path
+        self._bitmap = bitmap
+        self._palette = palette
+        self._rows_per_step = rows_per_step
+        #BMP rows are padded to a multiple of 4 bytes
+        self._row_size = (bitmap.width + 3) & ~3
+        self._buffer = bytearray(self._row_size * rows_per_step)
+        self._file = None
+        #BMP stores the bottom row first
+        self._next_row = bitmap.height - 1
+
+    @property
+    def done(self):
+        return self._next_row < 0 and self._file is None
+
+    def _write_headers(self):
+        colors = len(self._palette)
+        offset = HEADERS_SIZE + 4 * colors
+        image_size = self._row_size * self._bitmap.height
+        self._file.write(struct.pack(FILE_HEADER, b'BM', offset + image_size,
+                                     0, 0, offset))
+        self._file.write(struct.pack(INFO_HEADER, 40, self._bitmap.width,
+                                     self._bitmap.height, 1, 8, 0, image_size,
+                                     2835, 2835, colors, 0))
+        for i in range(colors):
+            color = self._palette[i]
+            self._file.write(struct.pack('<BBBB', color & 0xFF,
+                                         (color >> 8) & 0xFF,
+                                         (color >> 16) & 0xFF, 0))
+
+    def step(self):
+        """Write the next rows, returns True once the file is complete."""
+        if self.done:
+            return True
+        if self._file is None:
+            self._file = open(self._path, 'wb')
+            self._write_headers()
+        bitmap = self._bitmap
+        width = bitmap.width
+        buffer = self._buffer
+        rows = min(self._rows_per_step, self._next_row + 1)
+        k = 0
+        for y in range(self._next_row, self._next_row - rows, -1):
+            row = y * width
+            for i in range(row, row + width):
+                buffer[k] = bitmap[i]
+                k += 1
+            k += self._row_size - width
+        self._file.write(memoryview(buffer)[:rows * self._row_size])
+        self._next_row -= rows
+        if self._next_row < 0:
+            self._file.close()
+            self._file = None
+            return True
+        return False
+
+    def run(self):
+        """Write the whole file in one go."""
+        while not self.step():
+            pass
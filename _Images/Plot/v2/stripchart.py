@@ -0,0 +1,298 @@
+'''
+CES 20211018
+Column renderer for the temp/light strip chart.
+
+Only the column being sampled is touched, so one sample costs O(height)
+pixel writes instead of a walk over the whole bitmap. Samples are kept
+pre-aggregated at one resolution per selectable time range, so switching
+ranges redraws each column from a stored bucket instead of raw samples.
+The axes follow a sliding min/max over the columns on screen.
+'''
+
+import array
+
+from primitives import vspan
+
+#Temperature is kept in hundredths of a degree so it fits in an int16
+TEMP_SCALE = 100
+
+
+def clip_span(y0, y1, line_height, height):
+    """Return the (start, stop) rows covering y0..y1 widened by a line of
+    half height line_height, clipped to the bitmap.
+
+    For y0 == y1 this matches the abs(y - ypixel) < line_height test of
+    the original loop.
+    """
+    if y1 < y0:
+        y0, y1 = y1, y0
+    start = y0 - line_height + 1
+    stop = y1 + line_height
+    if start < 0:
+        start = 0
+    if stop > height:
+        stop = height
+    return start, stop
+
+
+def draw_column(bitmap, x, height, spans, background=0):
+    """Redraw column x of the bitmap.
+
+    :param bitmap: the chart bitmap
+    :param x: the column to redraw
+    :param height: number of rows in the bitmap
+    :param spans: list of (y0, y1, line_height, color), drawn in order so
+        later spans win where they overlap
+    :param background: palette index for the rest of the column
+    """
+    vspan(bitmap, x, 0, height, background)
+    for y0, y1, line_height, color in spans:
+        start, stop = clip_span(y0, y1, line_height, height)
+        vspan(bitmap, x, start, stop, color)
+
+
+class SampleHistory:
+    """Fixed size ring buffer of temperature and light samples.
+
+    Samples are stored as scaled integers in two arrays, so the history
+    costs 4 bytes per sample and never grows after construction.
+    """
+
+    def __init__(self, size):
+        self._size = size
+        self._temp = array.array('h', (0 for _ in range(size)))
+        self._light = array.array('H', (0 for _ in range(size)))
+        self._count = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def count(self):
+        """Total number of samples appended, including overwritten ones."""
+        return self._count
+
+    @property
+    def first(self):
+        """Index of the oldest sample still held."""
+        return max(0, self._count - self._size)
+
+    @property
+    def nbytes(self):
+        return 4 * self._size
+
+    def append(self, temperature, light):
+        """Store a sample already scaled by TEMP_SCALE."""
+        i = self._count % self._size
+        self._temp[i] = temperature
+        self._light[i] = light
+        self._count += 1
+
+    def column(self, n):
+        """Return (tmin, tmax, tmean, lmin, lmax, lmean) for sample n, where
+        n counts from the first append, or None if it is not held."""
+        if n < self.first or n >= self._count:
+            return None
+        i = n % self._size
+        t = self._temp[i] / TEMP_SCALE
+        l = self._light[i]
+        return t, t, t, l, l, l
+
+
+class BucketLevel:
+    """Ring of min/max/mean buckets, each covering samples_per_bucket
+    consecutive samples. The newest bucket is updated as samples arrive."""
+
+    def __init__(self, samples_per_bucket, size):
+        self._k = samples_per_bucket
+        self._size = size
+        self._tmin = array.array('h', (0 for _ in range(size)))
+        self._tmax = array.array('h', (0 for _ in range(size)))
+        self._tmean = array.array('h', (0 for _ in range(size)))
+        self._lmin = array.array('H', (0 for _ in range(size)))
+        self._lmax = array.array('H', (0 for _ in range(size)))
+        self._lmean = array.array('H', (0 for _ in range(size)))
+        self._last = -1
+        self._count = 0
+        self._tsum = 0
+        self._lsum = 0
+
+    @property
+    def nbytes(self):
+        return 12 * self._size
+
+    def add(self, n, temperature, light):
+        """Add sample number n, already scaled by TEMP_SCALE."""
+        b = n // self._k
+        i = b % self._size
+        if b != self._last:
+            self._last = b
+            self._count = 0
+            self._tsum = 0
+            self._lsum = 0
+            self._tmin[i] = temperature
+            self._tmax[i] = temperature
+            self._lmin[i] = light
+            self._lmax[i] = light
+        else:
+            if temperature < self._tmin[i]:
+                self._tmin[i] = temperature
+            elif temperature > self._tmax[i]:
+                self._tmax[i] = temperature
+            if light < self._lmin[i]:
+                self._lmin[i] = light
+            elif light > self._lmax[i]:
+                self._lmax[i] = light
+        self._count += 1
+        self._tsum += temperature
+        self._lsum += light
+        self._tmean[i] = self._tsum // self._count
+        self._lmean[i] = self._lsum // self._count
+
+    def column(self, b):
+        """Return (tmin, tmax, tmean, lmin, lmax, lmean) for bucket b, or
+        None if it has not been filled or was overwritten."""
+        if b < 0 or b > self._last or b <= self._last - self._size:
+            return None
+        i = b % self._size
+        return (self._tmin[i] / TEMP_SCALE, self._tmax[i] / TEMP_SCALE,
+                self._tmean[i] / TEMP_SCALE,
+                self._lmin[i], self._lmax[i], self._lmean[i])
+
+
+class ChartHistory:
+    """Sample history kept at every chart resolution.
+
+    Level k holds one bucket per chart column for a time range of k times
+    the shortest one. Level 1 is the raw samples, the others are buckets,
+    so memory is fixed at construction and reported by nbytes.
+    """
+
+    def __init__(self, width, levels):
+        self._samples = SampleHistory(width)
+        self._levels = [self._samples]
+        for k in range(2, levels + 1):
+            self._levels.append(BucketLevel(k, width))
+
+    @property
+    def count(self):
+        return self._samples.count
+
+    @property
+    def capacity(self):
+        """Number of samples needed to fill the longest range."""
+        return self._samples.size * len(self._levels)
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for level in self._levels)
+
+    def append(self, temperature, light):
+        n = self._samples.count
+        temperature = int(temperature * TEMP_SCALE)
+        light = int(light)
+        self._samples.append(temperature, light)
+        for level in self._levels[1:]:
+            level.add(n, temperature, light)
+
+    def column(self, samples_per_column, c):
+        """Return (tmin, tmax, tmean, lmin, lmax, lmean) for chart column c
+        at the given resolution, or None if there is no data for it."""
+        return self._levels[samples_per_column - 1].column(c)
+
+
+class SlidingExtreme:
+    """Max (or min) over the last size chart columns.
+
+    A monotonic queue kept in two preallocated ring arrays. The newest
+    column may be pushed several times as its samples arrive, each push
+    is O(1) amortised.
+    """
+
+    def __init__(self, size, maximum=True):
+        self._size = size + 1
+        self._maximum = maximum
+        self._index = array.array('l', (0 for _ in range(self._size)))
+        self._value = array.array('f', (0 for _ in range(self._size)))
+        self.clear()
+
+    def clear(self):
+        self._head = 0
+        self._len = 0
+
+    def _beats(self, a, b):
+        #True if a makes b redundant
+        if self._maximum:
+            return a >= b
+        return a <= b
+
+    def push(self, index, value):
+        """Add value for column index, index never goes backwards."""
+        size = self._size
+        while self._len:
+            tail = (self._head + self._len - 1) % size
+            if self._beats(self._value[tail], value) and self._index[tail] == index:
+                return
+            if not self._beats(value, self._value[tail]):
+                break
+            self._len -= 1
+        tail = (self._head + self._len) % size
+        self._index[tail] = index
+        self._value[tail] = value
+        self._len += 1
+
+    def expire(self, oldest):
+        """Drop columns before index oldest."""
+        while self._len and self._index[self._head] < oldest:
+            self._head = (self._head + 1) % self._size
+            self._len -= 1
+
+    @property
+    def value(self):
+        if not self._len:
+            return None
+        return self._value[self._head]
+
+
+class AutoAxis:
+    """Axis bounds that follow the data with hysteresis.
+
+    Bounds snap to multiples of step with a step of margin. They only move
+    when the data leaves them or shrinks to under a third of their span,
+    so small wiggles do not force a full chart redraw.
+    """
+
+    def __init__(self, low, high, step, min_span, floor=None, ceiling=None):
+        self.low = low
+        self.high = high
+        self._step = step
+        self._min_span = min_span
+        self._floor = floor
+        self._ceiling = ceiling
+
+    def update(self, data_low, data_high):
+        """Rescale for the data range, returns True if the bounds moved."""
+        if data_low is None or data_high is None:
+            return False
+        if (self.low <= data_low and data_high <= self.high and
+                3 * (data_high - data_low) >= self.high - self.low):
+            return False
+        step = self._step
+        low = (data_low // step - 1) * step
+        high = (-(-data_high // step) + 1) * step
+        while high - low < self._min_span:
+            low -= step
+            high += step
+        if self._floor is not None and low < self._floor:
+            high += self._floor - low
+            low = self._floor
+        if self._ceiling is not None and high > self._ceiling:
+            low = max(self._floor if self._floor is not None else low,
+                      low - (high - self._ceiling))
+            high = self._ceiling
+        if low == self.low and high == self.high:
+            return False
+        self.low = low
+        self.high = high
+        return True
@@ -15,6 +15,9 @@ import adafruit_touchscreen
 
 import adafruit_bme680
 
+from primitives import fill
+from stripchart import draw_column
+
 display = board.DISPLAY
 
 # Create a bitmap with three colors
@@ -86,9 +89,7 @@ while False:
 
 
 def clear():
-    for x in range(0,display.width):
-        for y in range(0,display.height):
-            bitmap[x,y] = 0
+    fill(bitmap,0)
 
 def createText(level,maxval,minval,x,incolor):
     val = int(level*(maxval-minval)+minval)
@@ -269,14 +270,9 @@ while 1:
             ctr = 0
             #Clear the screen
             #clear()
-        for x in range(0,display.width):
-            for y in range(0,display.height):
-                if x == ctr and abs(y-ypixel_temp) < line_height:
-                    bitmap[x,y] = 2
-                elif x == ctr and abs(y-ypixel_light) < line_height:
-                    bitmap[x,y] = 1
-                elif x == ctr:
-                    bitmap[x,y] = 0
+        #Redraw only the current column, temp is drawn last so it wins over light
+        draw_column(bitmap, ctr, display.height,
+                    [(ypixel_light, line_height, 1), (ypixel_temp, line_height, 2)])
         bitmap[ctr,0] = 3
         bitmap[ctr,1] = 3
         bitmap[ctr,2] = 3
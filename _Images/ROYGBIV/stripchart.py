@@ -0,0 +1,40 @@
+'''
+CES 20211018
+Column renderer for the temp/light strip chart.
+
+Only the column being sampled is touched, so one sample costs O(height)
+pixel writes instead of a walk over the whole bitmap.
+'''
+
+from primitives import vspan
+
+
+def clip_span(y, line_height, height):
+    """Return the (start, stop) rows covered by a line of half height
+    line_height centered on y, clipped to the bitmap.
+
+    Matches the abs(y - ypixel) < line_height test of the original loop.
+    """
+    start = y - line_height + 1
+    stop = y + line_height
+    if start < 0:
+        start = 0
+    if stop > height:
+        stop = height
+    return start, stop
+
+
+def draw_column(bitmap, x, height, spans, background=0):
+    """Redraw column x of the bitmap.
+
+    :param bitmap: the chart bitmap
+    :param x: the column to redraw
+    :param height: number of rows in the bitmap
+    :param spans: list of (ypixel, line_height, color), drawn in order so
+        later spans win where they overlap
+    :param background: palette index for the rest of the column
+    """
+    vspan(bitmap, x, 0, height, background)
+    for ypixel, line_height, color in spans:
+        start, stop = clip_span(ypixel, line_height, height)
+        vspan(bitmap, x, start, stop, color)
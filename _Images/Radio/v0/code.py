@@ -4,6 +4,7 @@
 import os
 import gc
 import adafruit_logging as logging
+import logs
 from collections import namedtuple
 import microcontroller
 import terminalio
@@ -25,7 +26,14 @@ import adafruit_imageload
 from adafruit_display_shapes.circle import Circle
 from math import sqrt
 
-_DEBUG = True
+try:
+    from micropython import const
+except ImportError:
+    def const(x):
+        return x
+
+#Set to 0 to strip the per frame debug logging, see logs.py
+_DEBUG = const(1)
 
 #Initialize i2c
 #i2c = board.I2C()
@@ -113,8 +121,7 @@ if USE_WIFI:
 
 APP_NAME = 'radio'
 
-logger = logging.getLogger(APP_NAME)
-logger.setLevel(logging.DEBUG)
+logger = logs.getLogger(APP_NAME, logging.DEBUG)
 
 title_welcome = 'Welcome to {}'.format(APP_NAME)
 
@@ -301,7 +308,8 @@ while True:
                 button_pressed = True
                 break
            
-        logger.debug("point: {}".format(point))
+        if _DEBUG and logger.debug_on:
+            logger.debug("point: %s", point)
         
         #Check for presses in the circle
         if not button_pressed and in_circle(point[0], point[1], circle_x, circle_y, circle_r):            
@@ -378,7 +386,8 @@ while True:
         
         if b is not None:
             #set when button is released
-            logger.debug("{} before. label/setting_frequency: {}/{}".format(c, b.label, setting_frequency))
+            if _DEBUG and logger.debug_on:
+                logger.debug("%d before. label/setting_frequency: %s/%s", c, b.label, setting_frequency)
             
             if b.label in ('0', '1', '2', '3', '4', '5', '6', '7', '8', '9'):
                 #if starting to set then initialize setting string
@@ -392,7 +401,8 @@ while True:
                 #When all digits have been set then set current_frequency
                 if '_' not in setting_frequency:
                     #Set frequency
-                    logger.debug("setting_frequency: " + setting_frequency)
+                    if _DEBUG and logger.debug_on:
+                        logger.debug("setting_frequency: %s", setting_frequency)
                     current_frequency = float(setting_frequency)
                     setting_frequency = '' #Reset
             elif b.label == 'Step':
@@ -420,7 +430,8 @@ while True:
             else:
                 label_freq.text = "{:.1f}Hz".format(current_frequency)
 
-            logger.debug("{} after. label/setting_frequency: {}/{}".format(c, b.label, setting_frequency))
+            if _DEBUG and logger.debug_on:
+                logger.debug("%d after. label/setting_frequency: %s/%s", c, b.label, setting_frequency)
             
             b.selected = False
 
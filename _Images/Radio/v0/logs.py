@@ -0,0 +1,47 @@
+'''
+CES 20211018
+Logging facade for code that logs in its hot paths.
+
+getLogger wraps an adafruit_logging logger with one flag per level, kept
+in step with setLevel. Guarding a call with the flag skips the call and
+the building and formatting of its message when the level is off, for
+the cost of one attribute check:
+
+    if _DEBUG and log.debug_on:
+        log.debug("point: %s", point)
+
+_DEBUG is a const in each calling module:
+
+    _DEBUG = const(1)
+
+Set it to 0 to strip the debug logging. The compiler folds the guard to
+False and leaves the guarded blocks out of the bytecode.
+'''
+
+import adafruit_logging as logging
+
+
+class Log:
+    """A logger with debug_on, info_on and warning_on flags. The level
+    methods are the wrapped logger's own, so an enabled call costs no
+    more than it did before."""
+
+    def __init__(self, logger, level):
+        self._logger = logger
+        self.debug = logger.debug
+        self.info = logger.info
+        self.warning = logger.warning
+        self.error = logger.error
+        self.setLevel(level)
+
+    def setLevel(self, level):
+        self._logger.setLevel(level)
+        self.level = level
+        self.debug_on = level <= logging.DEBUG
+        self.info_on = level <= logging.INFO
+        self.warning_on = level <= logging.WARNING
+
+
+def getLogger(name, level=logging.INFO):
+    """Return the named logger wrapped in a Log, set to level."""
+    return Log(logging.getLogger(name), level)
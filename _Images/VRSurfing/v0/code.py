@@ -6,6 +6,7 @@ import displayio
 import time
 import busio
 import adafruit_logging as logging
+import logs
 
 from adafruit_pyportal import PyPortal
 from simulation.Game import Surfing
@@ -20,6 +21,18 @@ import adafruit_touchscreen
 
 import adafruit_bme680
 
+from primitives import fill
+from stripchart import draw_column
+
+try:
+    from micropython import const
+except ImportError:
+    def const(x):
+        return x
+
+#Set to 0 to strip the per frame debug logging, see logs.py
+_DEBUG = const(1)
+
 display = board.DISPLAY
 
 # Touchscreen setup
@@ -45,8 +58,7 @@ pyportal = PyPortal() #for background
 
 APP_NAME = 'VR Surfing'
 
-logger = logging.getLogger(APP_NAME)
-logger.setLevel(logging.DEBUG)
+logger = logs.getLogger(APP_NAME, logging.DEBUG)
 
 title_welcome = 'Welcome to {}'.format(APP_NAME)
 
@@ -67,9 +79,7 @@ bitmap = displayio.Bitmap(display.width, display.height, 4)
 temperature_offset = -2.5
 
 def clear():
-    for x in range(0,display.width):
-        for y in range(0,display.height):
-            bitmap[x,y] = 0
+    fill(bitmap,0)
 
 def createText(level,maxval,minval,x,incolor):
     val = int(level*(maxval-minval)+minval)
@@ -182,7 +192,8 @@ while True:
     p = ts.touch_point
     
     if p:
-        logger.debug('Screen touched: {}'.format(p))
+        if _DEBUG and logger.debug_on:
+            logger.debug('Screen touched: %s', p)
             
         g.process_input(p)
         
@@ -216,14 +227,9 @@ while True:
             ctr = 0
             #Clear the screen
             #clear()
-        for x in range(0,display.width):
-            for y in range(0,display.height):
-                if x == ctr and abs(y-ypixel_temp) < line_height:
-                    bitmap[x,y] = 2
-                elif x == ctr and abs(y-ypixel_light) < line_height:
-                    bitmap[x,y] = 1
-                elif x == ctr:
-                    bitmap[x,y] = 0
+        #Redraw only the current column, temp is drawn last so it wins over light
+        draw_column(bitmap, ctr, display.height,
+                    [(ypixel_light, line_height, 1), (ypixel_temp, line_height, 2)])
         bitmap[ctr,0] = 3
         bitmap[ctr,1] = 3
         bitmap[ctr,2] = 3
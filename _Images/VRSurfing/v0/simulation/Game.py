@@ -1,9 +1,15 @@
 
 import time
+import displayio
 from adafruit_display_text import label
 import terminalio
 import math
 from adafruit_bitmap_font import bitmap_font
+try:
+    from micropython import const
+except ImportError:
+    def const(x):
+        return x
 
 #VRSurfing
 '''
@@ -15,6 +21,10 @@ from adafruit_bitmap_font import bitmap_font
 AQUA = 0x00FFFF
 BLUE = 0x0063D3
 LILAC = 0xc49eff
+WHITE = 0xFFFFFF
+
+#Set to 0 to strip the per frame debug logging, see logs.py
+_DEBUG = const(1)
 
 class Surfing:
     #Wave info
@@ -34,6 +44,10 @@ class Surfing:
     _score = 0
     _winning_amount = 10
     
+    #Timed effects, (due time, action, value) run by next_frame
+    _effects = None
+    _running = True
+    
 
     def __init__(self, logger, display = None, bitmap = None, group = None):
         self.log = logger
@@ -41,6 +55,12 @@ class Surfing:
         
         self._display = display
         self._bitmap = bitmap
+        self._effects = []
+        
+        #The board is its own sprite over the wave bitmap, so moving it is
+        #an x/y update and never touches the wave pixels underneath
+        self._board_sprite = self.createBoard()
+        self._board_sprite.hidden = True
         
         self._text_label = self.createText(0.8, 0.8, AQUA, '')
         self._text_label_score = self.createText(0.6, 0.8, BLUE, '')
@@ -49,6 +69,7 @@ class Surfing:
         self._text_label_win = self.createText(0.2, 0.5, LILAC, '', win_font)
         
         if group:
+            group.append(self._board_sprite)
             group.append(self._text_label)
             group.append(self._text_label_score)
             group.append(self._text_label_win)
@@ -62,8 +83,71 @@ class Surfing:
         return textobj
 
 
+    def _after(self, delay, action, value = None):
+        #Schedule action(value) for delay seconds from now instead of sleeping
+        self._effects.append((time.monotonic() + delay, action, value))
+
+
+    def _run_effects(self):
+        now = time.monotonic()
+        i = 0
+        while i < len(self._effects):
+            due, action, value = self._effects[i]
+            if due <= now:
+                self._effects.pop(i)
+                action(value)
+            else:
+                i += 1
+
+
+    def _set_banner(self, text):
+        self._text_label.text = text
+
+
+    def _hide_banner(self, value):
+        self._text_label.hidden = True
+
+
+    def _show_score(self, value):
+        self._text_label_score.text = "Your score is now {}!".format(self._score)
+        self._text_label_score.hidden = False
+
+
+    def _show_win(self, value):
+        self._text_label_win.text = "YOU WIN!! YOUR SCORE IS {}!!!".format(self._winning_amount)
+
+
+    def _end_game(self, value):
+        self._running = False
+
+
+    def createBoard(self):
+        size = 2 * (self._board_length // 2)
+        board_bitmap = displayio.Bitmap(size, size, 2)
+        for c in range(size):
+            board_bitmap[c, c] = 1
+        
+        board_palette = displayio.Palette(2)
+        board_palette.make_transparent(0)
+        board_palette[1] = WHITE
+        
+        return displayio.TileGrid(board_bitmap, pixel_shader=board_palette)
+
+
+    def _place_board(self):
+        self._board_sprite.x = self._board_vector[0] - self._board_length // 2
+        self._board_sprite.y = self._board_vector[1] - self._board_length // 2
+        self._board_sprite.hidden = False
+
+
     def next_frame(self):
         #self.log.debug('In next_frame x = {}'.format(self._wave_vector[0]))
+        
+        if self._effects:
+            self._run_effects()
+        
+        if not self._running:
+            return False
 
         c = 0
         self._bitmap[self._wave_vector[0] + c, self._wave_vector[1] + c] = 0
@@ -78,7 +162,8 @@ class Surfing:
 
         if self._wave_caught:
             if abs(self._wave_vector[1] - self._board_vector[1]) > self._wave_dx:
-                self.log.debug('CAUGHT WAVE!')
+                if _DEBUG and self.log.debug_on:
+                    self.log.debug('CAUGHT WAVE!')
                 self._wave_caught = False
             elif self._board_vector[0] + 1 + (self._board_length // 2) >= self._display.width:
                 #When at the edge of the screen reset
@@ -87,33 +172,29 @@ class Surfing:
             else:                    
                 #move along board
                 self.move_board(self._board_vector[0] + 1, self._board_vector[1])
-        else:
+        elif self._score < self._winning_amount:
             #self.log.debug('check if caught wave')
             
             if abs(self._wave_vector[0] - self._board_vector[0]) < self._wave_dx and abs(self._wave_vector[1] - self._board_vector[1]) < self._wave_dx:
                 self._text_label_score.hidden = True
-                self.log.debug('CAUGHT WAVE!')
+                if _DEBUG and self.log.debug_on:
+                    self.log.debug('CAUGHT WAVE!')
                 self._text_label.hidden = False
                 self._text_label.text= 'CAUGHT WAVE'
                 
-                time.sleep(0.6)
-                
-                self._text_label.text= ''
-                time.sleep(0.1)
-                
-                self._text_label.text= 'CAUGHT WAVE'
-                time.sleep(0.7)
-                self._text_label.hidden = True
+                #Blink the banner while the wave keeps moving
+                self._effects = []
+                self._after(0.6, self._set_banner, '')
+                self._after(0.7, self._set_banner, 'CAUGHT WAVE')
+                self._after(1.4, self._hide_banner)
                 
                 self._score += 1
                 
-                if self._score == self._winning_amount:
-                    self._text_label_win.text = "YOU WIN!! YOUR SCORE IS {}!!!".format(self._winning_amount)
-                    time.sleep(3)
-                    return False
+                if self._score >= self._winning_amount:
+                    self._after(1.4, self._show_win)
+                    self._after(4.4, self._end_game)
                 else:
-                    self._text_label_score.text= "Your score is now {}!".format(self._score)
-                    self._text_label_score.hidden = False
+                    self._after(1.4, self._show_score)
                     
                 self._wave_caught = True
                 
@@ -122,7 +203,8 @@ class Surfing:
         return True
 
     def process_input(self, p):
-        self.log.debug('In process_input = {}'.format(p))
+        if _DEBUG and self.log.debug_on:
+            self.log.debug('In process_input = %s', p)
         
         if p[1] > self._wave_vector[1]:
             self.move_board_down()
@@ -133,36 +215,23 @@ class Surfing:
     def move_board(self, x,  y):
         #self.log.debug('In move_board')
         
-        for c in range(-(self._board_length // 2), self._board_length // 2):
-            self._bitmap[self._board_vector[0] + c, self._board_vector[1] + c] = 0
-        
         self._board_vector = [x, y]
-        
-        for c in range(-(self._board_length // 2), self._board_length // 2):
-            self._bitmap[self._board_vector[0] + c, self._board_vector[1] + c] = 3
+        self._place_board()
 
 
     def move_board_up(self):
-        self.log.debug('UP!')
+        if _DEBUG and self.log.debug_on:
+            self.log.debug('UP!')
     
-        for c in range(-(self._board_length // 2), self._board_length // 2):
-            self._bitmap[self._board_vector[0] + c, self._board_vector[1] + c] = 0
-        
         self._board_vector[1] -= 2
-        
-        for c in range(-(self._board_length // 2), self._board_length // 2):
-            self._bitmap[self._board_vector[0] + c, self._board_vector[1] + c] = 3
+        self._place_board()
 
 
     def move_board_down(self):
-        self.log.debug('Down!')
+        if _DEBUG and self.log.debug_on:
+            self.log.debug('Down!')
     
-        for c in range(-(self._board_length // 2), self._board_length // 2):
-            self._bitmap[self._board_vector[0] + c, self._board_vector[1] + c] = 0
-        
         self._board_vector[1] += 2
-        
-        for c in range(-(self._board_length // 2), self._board_length // 2):
-            self._bitmap[self._board_vector[0] + c, self._board_vector[1] + c] = 3
+        self._place_board()
 
         
\ No newline at end of file